@@ -23,18 +23,22 @@ DB_NAME = os.getenv('DB_NAME', 'quizdb')
 DB_USER = os.getenv('DB_USER', 'my_user')
 DB_PASS = os.getenv('DB_PASS', 'password')
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}'
+# DATABASE_URL, when set, overrides the individual settings (the tests point it at a scratch database)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize the database
 db.init_app(app)
 
-# Enable CORS for cross-origin requests
-CORS(app)
+# Enable CORS for cross-origin requests (and let the browser read the pagination cursor)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Total-Count', 'X-Shuffle-Seed'])
 
 # Import routes (ensure you have a 'routes.py' file in your backend directory)
 import routes
 
+# Register the maintenance CLI commands (run with `flask --app main <command>`)
+import commands
+
 # Database initialization
 with app.app_context():
     db.create_all()
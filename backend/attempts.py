@@ -0,0 +1,79 @@
+# attempts.py
+
+import re
+import uuid
+from flask import request, session, abort
+from sqlalchemy import select, func, cast, literal, and_, Text
+from sqlalchemy.dialects.postgresql import insert
+from app_init import db
+from models import Attempt, AttemptPosition, Question
+from payload_cache import notify_payloads_changed
+
+# Takers identify themselves with this header; clients that send none get an id kept in their session cookie
+TAKER_HEADER = 'X-User-Id'
+# Answers migrated from the question rows belong to this taker
+DEFAULT_TAKER_ID = 'default'
+TAKER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+def current_taker_id():
+    taker_id = request.headers.get(TAKER_HEADER)
+    if not taker_id:
+        # One id per browser, so clients without the header never share (and lock) one attempt row
+        taker_id = session.get('taker_id')
+        if not taker_id:
+            taker_id = session['taker_id'] = uuid.uuid4().hex
+    if not TAKER_ID_PATTERN.match(taker_id):
+        abort(400, description=f"{TAKER_HEADER} must be 1-64 letters, digits, '.', '_' or '-'")
+    return taker_id
+
+def attempt_scope(quiz_set_id, taker_id):
+    # Payload cache scope of everything one taker sees of a quiz set
+    return f"{quiz_set_id}/{taker_id}"
+
+def attempt_id_of(quiz_set_id, taker_id):
+    # Scalar subquery, so reads can join a taker's answers without a separate lookup
+    return select(Attempt.id).where(Attempt.quiz_set_id == quiz_set_id, Attempt.taker_id == taker_id).scalar_subquery()
+
+def shuffle_seed_of(quiz_set_id, taker_id):
+    return db.session.query(Attempt.shuffle_seed).filter_by(quiz_set_id=quiz_set_id, taker_id=taker_id).scalar()
+
+def store_shuffle(attempt_id, quiz_set_id, seed):
+    # The permutation is computed once here, ordered by a seeded hash of the id so the same seed gives the same order
+    AttemptPosition.query.filter_by(attempt_id=attempt_id).delete(synchronize_session=False)
+    db.session.execute(insert(AttemptPosition).from_select(
+        ['attempt_id', 'position', 'question_id'],
+        select(
+            literal(attempt_id),
+            func.row_number().over(order_by=(func.md5(cast(Question.id, Text) + seed), Question.id)) - 1,
+            Question.id
+        ).where(Question.quiz_set_id == quiz_set_id)
+    ))
+    Attempt.query.filter_by(id=attempt_id).update({Attempt.shuffle_seed: seed}, synchronize_session=False)
+
+def with_taker_positions(query, quiz_set_id, taker_id):
+    # Only for shuffled takers: orders by AttemptPosition.position instead of Question.order
+    return query.join(AttemptPosition, and_(
+        AttemptPosition.question_id == Question.id, AttemptPosition.attempt_id == attempt_id_of(quiz_set_id, taker_id)
+    ))
+
+def ensure_attempts(taker_id, quiz_set_ids):
+    """Return {quiz_set_id: attempt_id} for the taker, creating missing attempts."""
+    quiz_set_ids = list(set(quiz_set_ids))
+    if not quiz_set_ids:
+        return {}
+    db.session.execute(
+        insert(Attempt)
+        .values([{'quiz_set_id': quiz_set_id, 'taker_id': taker_id} for quiz_set_id in quiz_set_ids])
+        .on_conflict_do_nothing(constraint='uq_attempt_quiz_set_taker')
+    )
+    return dict(db.session.execute(
+        select(Attempt.quiz_set_id, Attempt.id).where(Attempt.taker_id == taker_id, Attempt.quiz_set_id.in_(quiz_set_ids))
+    ).all())
+
+def bump_attempt_versions(taker_id, quiz_set_ids):
+    # Only this taker's ETags and cached payloads change, so other takers of the set keep theirs
+    quiz_set_ids = list(set(quiz_set_ids))
+    Attempt.query.filter(Attempt.taker_id == taker_id, Attempt.quiz_set_id.in_(quiz_set_ids)) \
+        .update({Attempt.version: Attempt.version + 1}, synchronize_session=False)
+    for quiz_set_id in quiz_set_ids:
+        notify_payloads_changed(attempt_scope(quiz_set_id, taker_id))
@@ -0,0 +1,249 @@
+# commands.py
+
+import json
+import pickle
+import sys
+import click
+from sqlalchemy import text, func, insert, literal_column
+from app_init import app, db
+from models import QuizSet, Question, QuestionLshBand, FurtherExplanation, Answer, AttemptPosition, ExplanationJob, SEARCH_CONFIG, QUESTION_SEARCH_VECTOR
+from attempts import DEFAULT_TAKER_ID
+from plain_text import plain_text_columns
+from fingerprints import fingerprint_columns, lsh_band_rows, near_duplicate_clusters, describe_clusters
+from explanation_jobs import create_explanation_job, run_explanation_job
+import config
+
+set_options_json = text('UPDATE question SET options_json = CAST(:options AS JSONB) WHERE id = :id')
+
+def question_options_type():
+    return db.session.execute(text(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = 'question' AND column_name = 'options'"
+    )).scalar()
+
+def options_json_params(rows):
+    # The rows are our own pickled option lists, so unpickling them here is safe
+    return [{'id': row.id, 'options': json.dumps(pickle.loads(bytes(row.options)))} for row in rows]
+
+def convert_pickled_options(batch_size):
+    # Copy pickled options into options_json one keyset batch at a time so the table is never loaded whole
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            'SELECT id, options FROM question WHERE options_json IS NULL AND id > :last_id ORDER BY id LIMIT :batch_size'
+        ), {'last_id': last_id, 'batch_size': batch_size}).all()
+        if not rows:
+            return converted
+
+        db.session.execute(set_options_json, options_json_params(rows))
+        db.session.commit()
+
+        last_id = rows[-1].id
+        converted += len(rows)
+        print(f"Converted options of {converted} questions (last id {last_id})")
+
+@app.cli.command('migrate-options')
+@click.option('--batch-size', default=1000, show_default=True, help='Questions converted per transaction.')
+def migrate_options(batch_size):
+    """Convert the pickled question.options column to JSONB."""
+    if question_options_type() == 'jsonb':
+        print("question.options is already JSONB, nothing to migrate")
+        return
+
+    db.session.execute(text('ALTER TABLE question ADD COLUMN IF NOT EXISTS options_json JSONB'))
+    db.session.commit()
+    convert_pickled_options(batch_size)
+
+    # Convert rows written while the batches ran, then swap the columns in one transaction
+    db.session.execute(text('LOCK TABLE question IN SHARE ROW EXCLUSIVE MODE'))
+    leftovers = db.session.execute(text('SELECT id, options FROM question WHERE options_json IS NULL')).all()
+    if leftovers:
+        db.session.execute(set_options_json, options_json_params(leftovers))
+    db.session.execute(text('ALTER TABLE question DROP COLUMN options'))
+    db.session.execute(text('ALTER TABLE question RENAME COLUMN options_json TO options'))
+    db.session.execute(text('ALTER TABLE question ALTER COLUMN options SET NOT NULL'))
+    db.session.commit()
+    print("question.options is now JSONB")
+
+set_plain_text = text(
+    'UPDATE question SET text_plain = :text_plain, options_plain = :options_plain, explanation_plain = :explanation_plain, '
+    'content_hash = :content_hash, minhash = CAST(:minhash AS JSONB) WHERE id = :id'
+)
+
+def plain_text_params(row):
+    plain = plain_text_columns(row.text, row.options, row.explanation)
+    fingerprints = fingerprint_columns(row.text, row.options, plain['text_plain'], plain['options_plain'])
+    return {'id': row.id, **plain, 'content_hash': fingerprints['content_hash'],
+            'minhash': json.dumps(fingerprints['minhash']) if fingerprints['minhash'] else None}
+
+@app.cli.command('backfill-plain-text')
+@click.option('--batch-size', default=1000, show_default=True, help='Questions converted per transaction.')
+@click.option('--recompute', is_flag=True, help='Also refresh questions that already have plain text and fingerprints.')
+def backfill_plain_text(batch_size, recompute):
+    """Fill the plain-text columns, fingerprints and LSH bands of questions scraped before they existed."""
+    # Keyset batches like migrate-options, so the table is never loaded whole and each batch commits on its own
+    converted = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(text(
+            'SELECT id, text, options, explanation FROM question '
+            'WHERE (:recompute OR text_plain IS NULL OR content_hash IS NULL '
+            'OR (minhash IS NOT NULL AND NOT EXISTS (SELECT 1 FROM question_lsh_band WHERE question_id = question.id))) '
+            'AND id > :last_id ORDER BY id LIMIT :batch_size'
+        ), {'recompute': recompute, 'last_id': last_id, 'batch_size': batch_size}).all()
+        if not rows:
+            break
+
+        params = [plain_text_params(row) for row in rows]
+        db.session.execute(set_plain_text, params)
+        # Band rows follow the recomputed signatures
+        QuestionLshBand.query.filter(QuestionLshBand.question_id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        band_rows = [band for row in params for band in lsh_band_rows(row['id'], json.loads(row['minhash']) if row['minhash'] else None)]
+        if band_rows:
+            db.session.execute(insert(QuestionLshBand), band_rows)
+        db.session.commit()
+
+        last_id = rows[-1].id
+        converted += len(rows)
+        print(f"Stored plain text and fingerprints of {converted} questions (last id {last_id})")
+    print(f"Plain text and fingerprints backfilled for {converted} questions")
+
+def question_has_column(name):
+    return db.session.execute(text(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = 'question' AND column_name = :name"
+    ), {'name': name}).scalar() is not None
+
+@app.cli.command('migrate-answers')
+def migrate_answers():
+    """Move question.user_selected_option and question.favorite into the default taker's attempts."""
+    if not question_has_column('user_selected_option'):
+        print("Answers already live in the answer table, nothing to migrate")
+        return
+
+    # Block writers to the old columns while they are copied and dropped in one transaction
+    db.session.execute(text('LOCK TABLE question IN SHARE ROW EXCLUSIVE MODE'))
+    db.session.execute(text('''
+        INSERT INTO attempt (quiz_set_id, taker_id, version, created_at)
+        SELECT DISTINCT quiz_set_id, :taker_id, 1, now() FROM question
+        WHERE user_selected_option IS NOT NULL OR favorite
+        ON CONFLICT ON CONSTRAINT uq_attempt_quiz_set_taker DO NOTHING
+    '''), {'taker_id': DEFAULT_TAKER_ID})
+    moved = db.session.execute(text('''
+        INSERT INTO answer (attempt_id, question_id, selected_option, favorite)
+        SELECT attempt.id, question.id, question.user_selected_option, coalesce(question.favorite, false)
+        FROM question JOIN attempt ON attempt.quiz_set_id = question.quiz_set_id AND attempt.taker_id = :taker_id
+        WHERE question.user_selected_option IS NOT NULL OR question.favorite
+        ON CONFLICT (attempt_id, question_id) DO NOTHING
+    '''), {'taker_id': DEFAULT_TAKER_ID}).rowcount
+    db.session.execute(text('ALTER TABLE question DROP COLUMN user_selected_option, DROP COLUMN favorite'))
+    db.session.commit()
+    print(f"Moved {moved} answers to the '{DEFAULT_TAKER_ID}' taker's attempts")
+
+# Idempotent DDL that brings a database created by an older version up to date with models.py
+SCHEMA_UPGRADES = [
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_question_quiz_set_id_order ON question (quiz_set_id, "order")',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_further_explanation_question_id ON further_explanation (question_id)',
+    'ALTER TABLE quiz_set ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1',
+    'ALTER TABLE question ADD COLUMN IF NOT EXISTS discussion_comments_fetched_at TIMESTAMP',
+    'ALTER TABLE question ADD COLUMN IF NOT EXISTS text_plain TEXT',
+    'ALTER TABLE question ADD COLUMN IF NOT EXISTS options_plain TEXT',
+    'ALTER TABLE question ADD COLUMN IF NOT EXISTS explanation_plain TEXT',
+    # Adding a stored generated column rewrites the table once; run backfill-plain-text afterwards so older rows get vectors
+    f'ALTER TABLE question ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS ({QUESTION_SEARCH_VECTOR}) STORED',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_question_search_vector ON question USING gin (search_vector)',
+    'ALTER TABLE question ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)',
+    'ALTER TABLE question ADD COLUMN IF NOT EXISTS minhash JSONB',
+    'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_question_quiz_set_id_content_hash ON question (quiz_set_id, content_hash)',
+    'ALTER TABLE scrape_job ADD COLUMN IF NOT EXISTS skip_duplicates BOOLEAN NOT NULL DEFAULT false',
+    'ALTER TABLE scrape_job ADD COLUMN IF NOT EXISTS questions_skipped INTEGER NOT NULL DEFAULT 0',
+    'ALTER TABLE attempt ADD COLUMN IF NOT EXISTS shuffle_seed VARCHAR(64)',
+    'ALTER TABLE generated_explanation ALTER COLUMN explanation DROP NOT NULL',
+]
+
+@app.cli.command('upgrade-schema')
+def upgrade_schema():
+    """Apply new columns and indexes to an existing database without blocking writes."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for statement in SCHEMA_UPGRADES:
+            print(statement)
+            connection.execute(text(statement))
+    print("Schema is up to date")
+
+def hot_queries():
+    # (description, query, index the plan must use) for the queries behind the busiest endpoints
+    sample_quiz_set_id = '00000000-0000-0000-0000-000000000000'
+    return [
+        ('questions of a quiz set in order',
+         Question.query.filter_by(quiz_set_id=sample_quiz_set_id).order_by(Question.order),
+         'ix_question_quiz_set_id_order'),
+        ('answers of an attempt',
+         Answer.query.filter_by(attempt_id=1),
+         'answer_pkey'),
+        ('next page of a shuffled attempt',
+         AttemptPosition.query.filter(AttemptPosition.attempt_id == 1, AttemptPosition.position > 100).order_by(AttemptPosition.position),
+         'attempt_position_pkey'),
+        ('favorites of an attempt',
+         Answer.query.filter_by(attempt_id=1, favorite=True),
+         'ix_answer_favorites'),
+        ('further explanation of a question',
+         FurtherExplanation.query.filter_by(question_id=1),
+         'ix_further_explanation_question_id'),
+        ('full-text search over questions',
+         # The configuration is written as a cast because literal binds cannot render a REGCONFIG parameter
+         Question.query.filter(Question.search_vector.op('@@')(func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), 'sample'))),
+         'ix_question_search_vector'),
+    ]
+
+def query_plan(query):
+    # Small or empty tables make a sequential scan look cheapest, so ask whether the index is usable at all
+    db.session.execute(text('SET LOCAL enable_seqscan = off'))
+    sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return '\n'.join(db.session.execute(text(f'EXPLAIN {sql}')).scalars())
+
+@app.cli.command('check-query-plans')
+def check_query_plans():
+    """EXPLAIN the hot queries and fail if any of them cannot use its index."""
+    failures = 0
+    for description, query, index_name in hot_queries():
+        plan = query_plan(query)
+        uses_index = index_name in plan
+        failures += not uses_index
+        print(f"{'OK  ' if uses_index else 'FAIL'} {description}: expected {index_name}\n{plan}\n")
+    db.session.rollback()
+
+    if failures:
+        raise click.ClickException(f"{failures} hot queries do not use their index")
+    print("All hot queries use their indexes")
+
+@app.cli.command('pregenerate-explanations')
+@click.argument('quiz_set_id')
+@click.option('--concurrency', type=int, help='Questions explained at once (default EXPLANATION_CONCURRENCY).')
+def pregenerate_explanations(quiz_set_id, concurrency):
+    """Generate and store a further explanation for every question of a quiz set that has none."""
+    if not QuizSet.query.get(quiz_set_id):
+        raise click.ClickException(f"Quiz set {quiz_set_id} not found")
+
+    job = create_explanation_job(quiz_set_id)
+    run_explanation_job(job.id, quiz_set_id, concurrency)
+    db.session.refresh(job)
+    print(f"Job {job.id} {job.status}: {job.questions_done} of {job.questions_total} questions explained, {job.questions_failed} failed")
+    if job.status != 'completed':
+        raise click.ClickException('\n'.join(job.errors))
+
+@app.cli.command('report-near-duplicates')
+@click.option('--threshold', type=float, help='Minimum estimated similarity (default NEAR_DUPLICATE_THRESHOLD).')
+@click.option('--quiz-set-id', help='Only clusters touching this quiz set.')
+@click.option('--output', type=click.File('w'), default='-', help='File to write the JSON report to (default stdout).')
+def report_near_duplicates(threshold, quiz_set_id, output):
+    """Write the clusters of near-identical questions stored in more than one quiz set as JSON."""
+    threshold = config.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    if not 0 < threshold <= 1:
+        raise click.ClickException('threshold must be greater than 0 and at most 1')
+
+    clusters = near_duplicate_clusters(threshold, quiz_set_id)
+    clusters.sort(key=len, reverse=True)
+    json.dump({'threshold': threshold, 'clusters': describe_clusters(clusters)}, output, indent=2)
+    output.write('\n')
+    # stderr, so the count never ends up inside the JSON written to stdout
+    print(f"{len(clusters)} clusters of near-duplicate questions", file=sys.stderr)
@@ -1,16 +1,85 @@
 # config.py
 
+import os
 import ssl
 import warnings
-import requests
 import urllib3
 
 # Constants and initializations
 ssl._create_default_https_context = ssl._create_unverified_context
 warnings.filterwarnings("ignore", category=urllib3.exceptions.InsecureRequestWarning)
-session = requests.Session()
 question_counter = 1
 
+# Shared scraper HTTP client settings
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 10))  # Number of per-host connection pools kept alive
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 32))  # Connections kept alive per host
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 10))  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))  # Seconds to wait for response data
+
+# On-disk cache of scraped pages
+SCRAPE_CACHE_MODE = os.getenv('SCRAPE_CACHE_MODE', 'on')  # 'on', 'off', or 'only' to replay scrapes offline from the cache
+SCRAPE_CACHE_DIR = os.getenv('SCRAPE_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrape_cache'))
+SCRAPE_CACHE_TTL = int(os.getenv('SCRAPE_CACHE_TTL', 24 * 60 * 60))  # Seconds before a cached page is revalidated
+SCRAPE_CACHE_MAX_BYTES = int(os.getenv('SCRAPE_CACHE_MAX_BYTES', 512 * 1024 * 1024))  # Least recently used pages are evicted past this size
+
+# Rendered quiz PDFs, kept per quiz set version
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf_cache'))
+PDF_QUESTION_BATCH_SIZE = int(os.getenv('PDF_QUESTION_BATCH_SIZE', 500))  # Questions fetched per round trip while rendering
+
+# Seconds before a question's stored discussion comments are fetched again
+DISCUSSION_COMMENTS_TTL = int(os.getenv('DISCUSSION_COMMENTS_TTL', 6 * 60 * 60))
+
+# HTML parser used by the scrapers. lxml is several times faster but builds a different tree from the malformed
+# markup these sites serve (a <div> inside a <p>, unclosed <p> tags), which changes what the sibling walks find,
+# so only set SCRAPER_HTML_PARSER=lxml once the site parsers have been checked against saved pages
+HTML_PARSER = os.getenv('SCRAPER_HTML_PARSER', 'html.parser')
+
+# Background scraping job settings
+SCRAPE_JOB_WORKERS = int(os.getenv('SCRAPE_JOB_WORKERS', 2))  # Scrape jobs running at once per worker process
+SCRAPE_PAGE_CONCURRENCY = int(os.getenv('SCRAPE_PAGE_CONCURRENCY', 8))  # Pages fetched and parsed at once within a range (1 = sequential)
+SCRAPE_SET_CONCURRENCY = int(os.getenv('SCRAPE_SET_CONCURRENCY', 4))  # URL sets of one scrape request processed at once
+ORDER_BLOCK_SIZE = 1000000  # Order values reserved for each URL set while a scrape is running (less when a request has over 2146 sets)
+SCRAPE_INSERT_BATCH_SIZE = int(os.getenv('SCRAPE_INSERT_BATCH_SIZE', 500))  # Scraped questions written per multi-row INSERT
+SCRAPE_SKIP_DUPLICATES = os.getenv('SCRAPE_SKIP_DUPLICATES', 'false').lower() == 'true'  # Default for startScraping's skip_duplicates
+
+# Largest page a client can request from the paginated question listing
+MAX_QUESTIONS_PAGE_SIZE = int(os.getenv('MAX_QUESTIONS_PAGE_SIZE', 500))
+
+# Answer clicks are written straight away unless write-behind is on; buffered answers reach the
+# database (and other workers) within the flush interval, and are flushed once more on a clean exit
+SELECTION_WRITE_BEHIND = os.getenv('SELECTION_WRITE_BEHIND', 'false').lower() == 'true'
+SELECTION_FLUSH_INTERVAL = float(os.getenv('SELECTION_FLUSH_INTERVAL', 1.0))  # Seconds between flushes
+SELECTION_FLUSH_SIZE = int(os.getenv('SELECTION_FLUSH_SIZE', 500))  # Pending questions that trigger an early flush
+
+# LLM providers are raced by health: the next one is started after the hedge delay or a failure,
+# and a provider that fails LLM_CIRCUIT_FAILURES times in a row is skipped for the cooldown
+LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', 8))  # Seconds
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', 90))  # Seconds before an explanation request gives up
+LLM_MAX_PARALLEL = int(os.getenv('LLM_MAX_PARALLEL', 3))  # Providers asked at once for one prompt
+LLM_CIRCUIT_FAILURES = int(os.getenv('LLM_CIRCUIT_FAILURES', 3))
+LLM_CIRCUIT_COOLDOWN = float(os.getenv('LLM_CIRCUIT_COOLDOWN', 300))  # Seconds
+LLM_PROVIDER_WORKERS = int(os.getenv('LLM_PROVIDER_WORKERS', 16))  # Threads shared by all in-flight provider calls
+LLM_CLAIM_POLL_INTERVAL = float(os.getenv('LLM_CLAIM_POLL_INTERVAL', 1.0))  # Seconds between checks for a prompt another worker is generating
+
+# Pre-generating a quiz set's further explanations: background jobs, parallel questions per job and
+# the rate of new LLM requests across all of them
+EXPLANATION_JOB_WORKERS = int(os.getenv('EXPLANATION_JOB_WORKERS', 1))
+EXPLANATION_CONCURRENCY = int(os.getenv('EXPLANATION_CONCURRENCY', 4))
+EXPLANATION_RATE_PER_SECOND = float(os.getenv('EXPLANATION_RATE_PER_SECOND', 1.0))
+
+# Largest page of the dashboard's quiz-set summaries
+MAX_QUIZ_SET_PAGE_SIZE = int(os.getenv('MAX_QUIZ_SET_PAGE_SIZE', 200))
+
+# Estimated similarity at which /api/nearDuplicates groups questions of different sets
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.8))
+
+# Largest page of results /api/search returns at once
+MAX_SEARCH_PAGE_SIZE = int(os.getenv('MAX_SEARCH_PAGE_SIZE', 100))
+
+# In-process cache of encoded quiz-set responses; writes are broadcast to every worker on this NOTIFY channel
+PAYLOAD_CACHE_MAX_BYTES = int(os.getenv('PAYLOAD_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # Per worker, 0 disables the cache
+PAYLOAD_CACHE_CHANNEL = os.getenv('PAYLOAD_CACHE_CHANNEL', 'quiz_set_changed')
+
 # Dictionary for image types
 img_type_directory = {
     "within": "Within",
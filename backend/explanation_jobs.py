@@ -0,0 +1,133 @@
+# explanation_jobs.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import select, exists, literal
+from app_init import app, db
+from models import Question, FurtherExplanation, ExplanationJob
+from explanations import build_explanation_prompt, prompt_hash, cached_explanation, explanation_cache
+import config
+
+# Bounded pool that runs pre-generation jobs outside of the request workers
+explanation_executor = ThreadPoolExecutor(max_workers=config.EXPLANATION_JOB_WORKERS, thread_name_prefix='explanation-job')
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across every thread that shares it."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        time.sleep(max(0.0, start - now))
+
+llm_rate_limiter = RateLimiter(config.EXPLANATION_RATE_PER_SECOND)
+
+class ExplanationProgress:
+    """Collects done and failed counts for an explanation job and stores them on its ExplanationJob row."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.questions_done = 0
+        self.questions_failed = 0
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def question_done(self):
+        with self.lock:
+            self.questions_done += 1
+        self.save()
+
+    def question_failed(self, message):
+        with self.lock:
+            self.questions_failed += 1
+            self.errors.append(message)
+        self.save()
+
+    def save(self, **values):
+        with self.lock:
+            values.update(
+                questions_done=self.questions_done,
+                questions_failed=self.questions_failed,
+                errors=list(self.errors)
+            )
+        ExplanationJob.query.filter_by(id=self.job_id).update(values)
+        db.session.commit()
+
+def questions_without_explanation(quiz_set_id):
+    return db.session.query(Question.id, Question.text, Question.options, Question.answer, Question.explanation) \
+        .filter(Question.quiz_set_id == quiz_set_id) \
+        .filter(~exists().where(FurtherExplanation.question_id == Question.id)) \
+        .order_by(Question.order).all()
+
+def explain_question(question, progress):
+    with app.app_context():
+        try:
+            prompt = build_explanation_prompt(question.text, question.options, question.answer, question.explanation or '')
+            # Answers already in the prompt cache cost no provider call, so only new prompts wait for the rate limit
+            if cached_explanation(prompt_hash(prompt)) is None:
+                llm_rate_limiter.wait()
+            explanation = explanation_cache.explain(prompt)
+
+            # Someone may have saved an explanation for the question while this one was generated
+            db.session.execute(FurtherExplanation.__table__.insert().from_select(
+                ['question_id', 'explanation'],
+                select(literal(question.id), literal(explanation))
+                .where(~exists().where(FurtherExplanation.question_id == question.id))
+            ))
+            db.session.commit()
+            print(f"Stored further explanation for question {question.id}")
+            progress.question_done()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error explaining question {question.id}: {e}")
+            progress.question_failed(f"Question {question.id}: {e}")
+
+def run_explanation_job(job_id, quiz_set_id, concurrency=None):
+    with app.app_context():
+        progress = ExplanationProgress(job_id)
+        try:
+            questions = questions_without_explanation(quiz_set_id)
+            progress.save(status='running', questions_total=len(questions))
+
+            with ThreadPoolExecutor(max_workers=concurrency or config.EXPLANATION_CONCURRENCY, thread_name_prefix='explain-question') as executor:
+                list(executor.map(lambda question: explain_question(question, progress), questions))
+
+            progress.save(status='completed', finished_at=datetime.utcnow())
+        except Exception as e:
+            db.session.rollback()
+            print(f"Explanation job {job_id} failed: {e}")
+            progress.errors.append(str(e))
+            progress.save(status='failed', finished_at=datetime.utcnow())
+
+def create_explanation_job(quiz_set_id):
+    job = ExplanationJob(quiz_set_id=quiz_set_id)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def start_explanation_job(quiz_set_id):
+    # Create the job row and hand the generation to the background pool
+    job = create_explanation_job(quiz_set_id)
+    explanation_executor.submit(run_explanation_job, job.id, quiz_set_id)
+    return job
+
+def serialize_explanation_job(job):
+    return {
+        'id': job.id,
+        'quiz_set_id': job.quiz_set_id,
+        'status': job.status,
+        'questions_total': job.questions_total,
+        'questions_done': job.questions_done,
+        'questions_failed': job.questions_failed,
+        'errors': job.errors,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
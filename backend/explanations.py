@@ -0,0 +1,163 @@
+# explanations.py
+
+import hashlib
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from g4f import Provider, models
+from langchain.llms.base import LLM
+from langchain_g4f import G4FLLM
+from sqlalchemy import and_, delete, update
+from sqlalchemy.dialects.postgresql import insert
+from app_init import db
+from models import GeneratedExplanation
+from provider_scheduler import ProviderScheduler
+import config
+
+providers_to_try = [
+    Provider.Bing,
+    Provider.ChatBase,
+    Provider.ChatgptAi,
+    Provider.FreeGpt,
+    Provider.GPTalk,
+    Provider.GptForLove,
+    Provider.GptGo,
+    Provider.You,
+]
+
+def call_provider(provider, prompt, timeout):
+    llm: LLM = G4FLLM(
+        model=models.gpt_35_turbo,
+        provider=provider,
+        # Passed through to the provider's HTTP requests, so a hung provider frees its worker thread
+        create_kwargs={'timeout': max(1, int(timeout))},
+    )
+    return llm(prompt)
+
+provider_scheduler = ProviderScheduler(
+    providers_to_try,
+    call_provider,
+    hedge_delay=config.LLM_HEDGE_DELAY,
+    request_timeout=config.LLM_REQUEST_TIMEOUT,
+    max_parallel=config.LLM_MAX_PARALLEL,
+    failure_threshold=config.LLM_CIRCUIT_FAILURES,
+    cooldown=config.LLM_CIRCUIT_COOLDOWN,
+    workers=config.LLM_PROVIDER_WORKERS
+)
+
+def get_llm_response(prompt):
+    return provider_scheduler.complete(prompt)
+
+def build_explanation_prompt(question_text, options, answer, explanation=''):
+    # Construct the prompt for the AI bot
+    if explanation and explanation != "Explanation not found.":
+        return f"Given this explanation '{explanation}', explain further why {answer} is the answer to this following Question: {question_text} {' '.join(options)}. Explain it in the simplest and most appropriate way to understand, in Layman’s terms, why {answer} is the answer. Also, identify very brief keywords from the question_text that would serve as a memory guide or hint that would immediately kick in as to why we have the respective answer."
+    return f"Given this Question: {question_text} {' '.join(options)}, explain in the simplest and most appropriate way to understand, in Layman’s terms, why {answer} is the answer. Also, identify very brief keywords from the question_text that would serve as a memory guide or hint that would immediately kick in as to why we have the respective answer."
+
+def prompt_hash(prompt):
+    # Whitespace differences from scraping or the client must not split the cache
+    normalized = re.sub(r'\s+', ' ', prompt).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+# A claim older than this belongs to a worker that died mid-request, so another worker may take it over
+CLAIM_TIMEOUT = timedelta(seconds=config.LLM_REQUEST_TIMEOUT + 30)
+
+def cached_explanation(digest):
+    return db.session.query(GeneratedExplanation.explanation).filter_by(prompt_hash=digest).scalar()
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class ExplanationCache:
+    """Persistent LLM answers keyed by prompt hash, with one upstream call per prompt at a time.
+
+    Requests in this process for a prompt already being generated wait for that call, and other
+    processes see its placeholder row and poll until the answer is stored.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def explain(self, prompt):
+        digest = prompt_hash(prompt)
+        explanation = cached_explanation(digest)
+        if explanation is not None:
+            return explanation
+
+        with self.lock:
+            flight = self.flights.get(digest)
+            leader = flight is None
+            if leader:
+                flight = self.flights[digest] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self.generate(digest, prompt)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[digest]
+            flight.done.set()
+
+    def generate(self, digest, prompt):
+        # Other workers asking for the same prompt wait for the stored answer instead of calling the providers too
+        while True:
+            explanation, claimed = self.claim(digest)
+            if explanation is not None:
+                return explanation
+            if claimed:
+                break
+            time.sleep(config.LLM_CLAIM_POLL_INTERVAL)
+
+        # The claim is committed, so no connection is held while the providers answer
+        try:
+            explanation = get_llm_response(prompt)
+        except Exception:
+            # Let the next request claim the prompt again
+            db.session.execute(
+                delete(GeneratedExplanation)
+                .where(GeneratedExplanation.prompt_hash == digest, GeneratedExplanation.explanation.is_(None))
+            )
+            db.session.commit()
+            raise
+        db.session.execute(
+            update(GeneratedExplanation)
+            .where(GeneratedExplanation.prompt_hash == digest)
+            .values(explanation=explanation, created_at=datetime.utcnow())
+        )
+        db.session.commit()
+        return explanation
+
+    def claim(self, digest):
+        """Return (stored explanation, whether this worker now generates it), claiming the prompt with a placeholder row."""
+        now = datetime.utcnow()
+        try:
+            statement = insert(GeneratedExplanation).values(prompt_hash=digest, explanation=None, created_at=now)
+            claimed = db.session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[GeneratedExplanation.prompt_hash],
+                    set_={'created_at': now},
+                    where=and_(GeneratedExplanation.explanation.is_(None), GeneratedExplanation.created_at < now - CLAIM_TIMEOUT)
+                ).returning(GeneratedExplanation.prompt_hash)
+            ).first() is not None
+            explanation = None if claimed else cached_explanation(digest)
+            db.session.commit()
+            return explanation, claimed
+        except Exception:
+            db.session.rollback()
+            raise
+
+explanation_cache = ExplanationCache()
@@ -0,0 +1,211 @@
+# fingerprints.py
+
+import hashlib
+import random
+import re
+import struct
+import zlib
+from itertools import groupby
+from sqlalchemy import and_, func, select, tuple_
+from app_init import db
+from models import Question, QuestionLshBand, QuizSet
+
+# Changing any of these invalidates every stored signature, so they are not configurable
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 similarity usually share a band, pairs above 0.8 almost always do
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+SHINGLE_WORDS = 3
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Fixed seed so every process draws the same hash functions
+_seed = random.Random(20240601)
+PERMUTATIONS = [(_seed.randrange(1, MERSENNE_PRIME), _seed.randrange(0, MERSENNE_PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+IMG_SRC = re.compile(r"""<img\b[^>]*?\bsrc\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+
+def media_sources(html):
+    # Figure questions differ only in their images, which plain text drops
+    return [next(group for group in match if group is not None).strip() for match in IMG_SRC.findall(html or '')]
+
+def fingerprint_segments(text, options, text_plain, options_plain):
+    # (plain text, image sources) of the question and of each option, in order
+    option_texts = (options_plain or '').splitlines()
+    option_texts += [''] * (len(options) - len(option_texts))
+    return [(text_plain or '', media_sources(text))] + [
+        (option_plain, media_sources(option)) for option, option_plain in zip(options, option_texts)
+    ]
+
+def segment_tokens(segments):
+    tokens = []
+    for plain, sources in segments:
+        tokens.extend(re.findall(r'\w+', plain.lower()))
+        tokens.extend(f"img:{source}" for source in sources)
+    return tokens
+
+def content_hash(segments):
+    # Identical wording, images and options give the same hash, whatever markup, case or spacing the source page used
+    normalized = '\n'.join(
+        ' '.join(plain.lower().split()) + ''.join(f" [img:{source}]" for source in sources) for plain, sources in segments
+    )
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def shingles(tokens):
+    return {' '.join(tokens[i:i + SHINGLE_WORDS]) for i in range(len(tokens) - SHINGLE_WORDS + 1)}
+
+def minhash_signature(tokens):
+    # crc32 rather than hash(), which is salted per process
+    hashed = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(tokens)]
+    return [min((a * value + b) % MERSENNE_PRIME for value in hashed) & 0xFFFFFFFF for a, b in PERMUTATIONS]
+
+def fingerprint_columns(text, options, text_plain, options_plain):
+    """The content_hash and minhash values stored with a question, from its plain text, options and image sources.
+
+    Questions with fewer than SHINGLE_WORDS words and images get no fingerprint, so they are never treated as duplicates.
+    """
+    segments = fingerprint_segments(text, options, text_plain, options_plain)
+    tokens = segment_tokens(segments)
+    if len(tokens) < SHINGLE_WORDS:
+        return {'content_hash': None, 'minhash': None}
+    return {
+        'content_hash': content_hash(segments),
+        'minhash': minhash_signature(tokens)
+    }
+
+def band_bucket(values):
+    # Signed so the key fits a BIGINT column
+    digest = hashlib.blake2b(struct.pack(f'>{len(values)}I', *values), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+def lsh_band_rows(question_id, signature):
+    """The question_lsh_band rows of a question, one per band of its MinHash signature."""
+    if signature is None:
+        return []
+    return [
+        {'band': band, 'bucket': band_bucket(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]), 'question_id': question_id}
+        for band in range(LSH_BANDS)
+    ]
+
+def estimated_similarity(signature, other):
+    # The share of matching MinHash values estimates the Jaccard similarity of the two shingle sets
+    return sum(1 for a, b in zip(signature, other) if a == b) / MINHASH_PERMUTATIONS
+
+class DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, item, other):
+        self.parent[self.find(item)] = self.find(other)
+
+def candidate_buckets(quiz_set_id=None, batch_size=1000):
+    """Yield the question ids of each LSH bucket shared by questions of more than one quiz set.
+
+    Buckets are found in the database from question_lsh_band; with `quiz_set_id` only the buckets holding
+    one of that set's questions are read.
+    """
+    band = QuestionLshBand
+    shared = select(band.band, band.bucket).join(Question, Question.id == band.question_id)
+    if quiz_set_id:
+        own = select(band.band, band.bucket).join(Question, Question.id == band.question_id).where(Question.quiz_set_id == quiz_set_id)
+        shared = shared.where(tuple_(band.band, band.bucket).in_(own))
+    shared = (
+        shared.group_by(band.band, band.bucket)
+        .having(func.count(func.distinct(Question.quiz_set_id)) > 1)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(band.band, band.bucket, band.question_id)
+        .join(shared, and_(shared.c.band == band.band, shared.c.bucket == band.bucket))
+        .order_by(band.band, band.bucket, band.question_id)
+        .execution_options(yield_per=batch_size)
+    )
+    for _, group in groupby(rows, key=lambda row: (row.band, row.bucket)):
+        yield [row.question_id for row in group]
+
+def near_duplicate_clusters(threshold, quiz_set_id=None, batch_size=1000):
+    """Group questions of different quiz sets whose estimated similarity is at least `threshold`.
+
+    Only questions that share an LSH bucket are compared, each with one representative of every group already
+    found in that bucket, and signatures are loaded only for those candidates.
+    Returns clusters spanning more than one quiz set (and including `quiz_set_id` when given), each a list
+    of (question_id, quiz_set_id, similarity to the cluster's first question) sorted by quiz set.
+    """
+    signatures = {}
+    quiz_set_of = {}
+    clusters = DisjointSet()
+
+    def compare(buckets):
+        missing = list({question_id for members in buckets for question_id in members} - signatures.keys())
+        for start in range(0, len(missing), batch_size):
+            for question_id, question_quiz_set_id, signature in db.session.execute(
+                select(Question.id, Question.quiz_set_id, Question.minhash)
+                .where(Question.id.in_(missing[start:start + batch_size]))
+            ):
+                signatures[question_id] = signature
+                quiz_set_of[question_id] = question_quiz_set_id
+        for members in buckets:
+            representatives = []
+            for question_id in members:
+                for representative in representatives:
+                    if estimated_similarity(signatures[representative], signatures[question_id]) >= threshold:
+                        clusters.union(question_id, representative)
+                        break
+                else:
+                    representatives.append(question_id)
+
+    pending = []
+    pending_size = 0
+    for members in candidate_buckets(quiz_set_id, batch_size):
+        pending.append(members)
+        pending_size += len(members)
+        if pending_size >= batch_size:
+            compare(pending)
+            pending = []
+            pending_size = 0
+    compare(pending)
+
+    grouped = {}
+    for question_id in clusters.parent:
+        grouped.setdefault(clusters.find(question_id), []).append(question_id)
+
+    result = []
+    for members in grouped.values():
+        quiz_sets = {quiz_set_of[question_id] for question_id in members}
+        if len(quiz_sets) < 2 or (quiz_set_id and quiz_set_id not in quiz_sets):
+            continue
+        members.sort(key=lambda question_id: (quiz_set_of[question_id], question_id))
+        first = signatures[members[0]]
+        result.append([
+            (question_id, quiz_set_of[question_id], estimated_similarity(first, signatures[question_id]))
+            for question_id in members
+        ])
+    return result
+
+def describe_clusters(clusters):
+    # Text and set titles are only loaded for the questions that made it into a cluster
+    question_ids = [question_id for cluster in clusters for question_id, _, _ in cluster]
+    details = {}
+    for start in range(0, len(question_ids), 1000):
+        details.update({row.id: row for row in db.session.execute(
+            select(Question.id, Question.order, Question.text_plain, QuizSet.title)
+            .join(QuizSet, QuizSet.id == Question.quiz_set_id)
+            .where(Question.id.in_(question_ids[start:start + 1000]))
+        )})
+
+    return [{
+        'quiz_set_count': len({quiz_set_id for _, quiz_set_id, _ in cluster}),
+        'questions': [{
+            'id': question_id,
+            'quiz_set_id': quiz_set_id,
+            'quiz_set_title': details[question_id].title,
+            'order': details[question_id].order,
+            'text': details[question_id].text_plain,
+            'similarity': round(similarity, 3)
+        } for question_id, quiz_set_id, similarity in cluster]
+    } for cluster in clusters]
@@ -1,29 +1,99 @@
 # models.py
 
 from db import db
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 import uuid
 
+# Text search configuration behind question.search_vector; queries must use the same one to hit its index
+SEARCH_CONFIG = 'english'
+
+# Question text ranks above options, and options above the explanation
+QUESTION_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text_plain, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(options_plain, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(explanation_plain, '')), 'C')"
+)
+
 class QuizSet(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = db.Column(db.String(120), nullable=False)
     questions = db.relationship('Question', backref='quiz_set', lazy=True)
     eye_icon_state = db.Column(db.Boolean, default=True) 
     lock_state = db.Column(db.Boolean, default=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped by every write that changes what the read endpoints return
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
-    options = db.Column(db.PickleType, nullable=False)
+    options = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'), nullable=False)  # Existing pickled columns are converted by `flask migrate-options`
     answer = db.Column(db.String(10), nullable=False)
     quiz_set_id = db.Column(db.String(36), db.ForeignKey('quiz_set.id'), nullable=False)
-    favorite = db.Column(db.Boolean, default=False)
     url = db.Column(db.String(255))
     explanation = db.Column(db.Text)
+    # Tag-free copies of text, options (one per line) and explanation, written with the question; filled for older rows by `flask backfill-plain-text`
+    text_plain = db.Column(db.Text)
+    options_plain = db.Column(db.Text)
+    explanation_plain = db.Column(db.Text)
+    # Fingerprints of the plain text and options: exact duplicates share content_hash, near-duplicates most minhash values
+    content_hash = db.Column(db.String(64))
+    minhash = db.deferred(db.Column(db.JSON().with_variant(JSONB(), 'postgresql')))
+    # Kept up to date by Postgres from the plain-text columns; deferred so ordinary question loads never fetch it
+    search_vector = db.deferred(db.Column(TSVECTOR, db.Computed(QUESTION_SEARCH_VECTOR, persisted=True)))
     discussion_link = db.Column(db.String(255))
-    user_selected_option = db.Column(db.String(10), nullable=True)
     order = db.Column(db.Integer, nullable=False)  # Ensure this field is not nullable
     further_explanation = db.relationship('FurtherExplanation', backref='question', lazy=True)
     discussion_comments = db.Column(db.Text)
+    discussion_comments_fetched_at = db.Column(db.DateTime)  # Stored comments are refetched once older than DISCUSSION_COMMENTS_TTL
+
+    __table_args__ = (
+        # Every quiz page reads a set in order
+        db.Index('ix_question_quiz_set_id_order', 'quiz_set_id', 'order'),
+        db.Index('ix_question_search_vector', 'search_vector', postgresql_using='gin'),
+        # Duplicate checks of the question writer's skip-duplicates mode
+        db.Index('ix_question_quiz_set_id_content_hash', 'quiz_set_id', 'content_hash'),
+    )
+
+class Attempt(db.Model):
+    # One taker's run through a quiz set; its version covers that taker's answers and favorites
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_set_id = db.Column(db.String(36), db.ForeignKey('quiz_set.id'), nullable=False)
+    taker_id = db.Column(db.String(64), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    shuffle_seed = db.Column(db.String(64))  # Set by shuffleQuestions; the taker then sees the set in their AttemptPosition order
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('quiz_set_id', 'taker_id', name='uq_attempt_quiz_set_taker'),
+    )
+
+class AttemptPosition(db.Model):
+    # A shuffled taker's permutation of the set, stored by shuffleQuestions so pages are range scans on (attempt_id, position).
+    # Questions scraped into the set after a shuffle join it when the taker shuffles again
+    attempt_id = db.Column(db.Integer, db.ForeignKey('attempt.id'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('attempt_id', 'question_id', name='uq_attempt_position_question'),
+    )
+
+class Answer(db.Model):
+    # Keyed by attempt first, so reading or upserting one taker's answers never touches another taker's rows
+    attempt_id = db.Column(db.Integer, db.ForeignKey('attempt.id'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True, index=True)
+    selected_option = db.Column(db.String(10))
+    favorite = db.Column(db.Boolean, nullable=False, default=False, server_default='false')
+
+    __table_args__ = (
+        db.Index('ix_answer_favorites', 'attempt_id', postgresql_where=db.text('favorite')),
+    )
+
+class QuestionLshBand(db.Model):
+    # One row per LSH band of a question's MinHash signature; questions sharing a (band, bucket) are near-duplicate candidates
+    band = db.Column(db.SmallInteger, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True, index=True)
 
 class EditorContent(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -34,5 +104,35 @@ class EditorContent(db.Model):
 
 class FurtherExplanation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
-    explanation = db.Column(db.Text, nullable=False)
\ No newline at end of file
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
+    explanation = db.Column(db.Text, nullable=False)
+
+class GeneratedExplanation(db.Model):
+    # LLM answers keyed by the SHA-256 of the normalized prompt, so a repeated prompt never reaches a provider
+    prompt_hash = db.Column(db.String(64), primary_key=True)
+    explanation = db.Column(db.Text)  # NULL while a worker is generating it; created_at is then the claim time
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class ScrapeJob(db.Model):
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    quiz_set_id = db.Column(db.String(36), db.ForeignKey('quiz_set.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    pages_done = db.Column(db.Integer, nullable=False, default=0)
+    questions_inserted = db.Column(db.Integer, nullable=False, default=0)
+    rows_per_second = db.Column(db.Float)  # Insert throughput of the batched question writer
+    skip_duplicates = db.Column(db.Boolean, nullable=False, default=False, server_default='false')  # Questions already in the set are not inserted again
+    questions_skipped = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    errors = db.Column(db.JSON, nullable=False, default=list)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+class ExplanationJob(db.Model):
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    quiz_set_id = db.Column(db.String(36), db.ForeignKey('quiz_set.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    questions_total = db.Column(db.Integer, nullable=False, default=0)  # Questions that had no further explanation when the job started
+    questions_done = db.Column(db.Integer, nullable=False, default=0)
+    questions_failed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.JSON, nullable=False, default=list)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
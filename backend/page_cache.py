@@ -0,0 +1,190 @@
+# page_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+import config
+from scraper_http import http_client
+
+class PageCacheMiss(Exception):
+    """Raised in cache-only mode when a page has never been downloaded."""
+
+class PageCache:
+    """On-disk cache of scraped pages.
+
+    Bodies are stored once per content hash under objects/, and each URL has a small
+    entry under entries/ with the body hash, ETag and Last-Modified of its last download.
+    Entries older than the TTL are revalidated with a conditional GET, and the least
+    recently used entries are evicted once the cache grows past its size cap.
+    """
+
+    def __init__(self, directory, ttl, max_bytes, mode):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode  # 'on', 'off' or 'only' (replay from disk, never touch the network)
+        self.lock = threading.Lock()
+        self.total_bytes = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_served = 0
+
+    def entry_path(self, url):
+        return os.path.join(self.directory, 'entries', hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def object_path(self, body_hash):
+        return os.path.join(self.directory, 'objects', body_hash[:2], body_hash)
+
+    def write_file(self, path, data):
+        # Write to a temporary file first so other workers never read a half-written entry
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def lookup(self, url):
+        try:
+            with open(self.entry_path(url), 'r') as f:
+                entry = json.load(f)
+            with open(self.object_path(entry['body_hash']), 'rb') as f:
+                return entry, f.read()
+        except (OSError, ValueError, KeyError):
+            return None, None
+
+    def store(self, url, content, etag, last_modified):
+        body_hash = hashlib.sha256(content).hexdigest()
+        object_path = self.object_path(body_hash)
+        if not os.path.exists(object_path):
+            self.write_file(object_path, content)
+            with self.lock:
+                if self.total_bytes is not None:
+                    self.total_bytes += len(content)
+
+        entry = {
+            'url': url,
+            'body_hash': body_hash,
+            'size': len(content),
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time()
+        }
+        self.write_file(self.entry_path(url), json.dumps(entry).encode('utf-8'))
+        self.evict_if_needed()
+
+    def refresh(self, url, entry):
+        # A 304 means the cached body is still current, so only the entry's fetch time moves
+        entry['fetched_at'] = time.time()
+        self.write_file(self.entry_path(url), json.dumps(entry).encode('utf-8'))
+
+    def mark_used(self, url):
+        # The entry file's mtime doubles as its last-used time for LRU eviction
+        try:
+            os.utime(self.entry_path(url))
+        except OSError:
+            pass
+
+    def evict_if_needed(self):
+        with self.lock:
+            if self.total_bytes is not None and self.total_bytes <= self.max_bytes:
+                return
+            self.total_bytes = self.evict()
+
+    def evict(self):
+        entries_dir = os.path.join(self.directory, 'entries')
+        entries = []
+        for name in os.listdir(entries_dir) if os.path.isdir(entries_dir) else []:
+            path = os.path.join(entries_dir, name)
+            try:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+                entries.append((os.path.getmtime(path), path, entry['body_hash'], entry['size']))
+            except (OSError, ValueError, KeyError):
+                continue
+
+        # Object sizes are counted once even when several URLs share the same body
+        object_sizes = {body_hash: size for _, _, body_hash, size in entries}
+        references = {}
+        for _, _, body_hash, _ in entries:
+            references[body_hash] = references.get(body_hash, 0) + 1
+        total_bytes = sum(object_sizes.values())
+
+        for _, path, body_hash, size in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            references[body_hash] -= 1
+            if references[body_hash] == 0:
+                try:
+                    os.remove(self.object_path(body_hash))
+                except OSError:
+                    pass
+                total_bytes -= size
+
+        return total_bytes
+
+    def fetch(self, url):
+        """Return the body of `url`, from disk when possible. Raises requests.HTTPError like raise_for_status()."""
+        if self.mode == 'off':
+            response = http_client.get(url)
+            response.raise_for_status()
+            return response.content
+
+        entry, body = self.lookup(url)
+        if entry and (self.mode == 'only' or time.time() - entry['fetched_at'] < self.ttl):
+            self.mark_used(url)
+            self.record(hit=True, size=len(body))
+            return body
+        if self.mode == 'only':
+            self.record(hit=False)
+            raise PageCacheMiss(f"{url} is not in the page cache")
+
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = http_client.get(url, headers=headers)
+        if entry and response.status_code == 304:
+            self.refresh(url, entry)
+            self.record(hit=True, size=len(body), revalidated=True)
+            return body
+
+        response.raise_for_status()
+        self.record(hit=False)
+        self.store(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.content
+
+    def record(self, hit, size=0, revalidated=False):
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.bytes_served += size
+            else:
+                self.misses += 1
+            if revalidated:
+                self.revalidated += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'mode': self.mode,
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'bytes_served_from_cache': self.bytes_served
+            }
+
+page_cache = PageCache(
+    directory=config.SCRAPE_CACHE_DIR,
+    ttl=config.SCRAPE_CACHE_TTL,
+    max_bytes=config.SCRAPE_CACHE_MAX_BYTES,
+    mode=config.SCRAPE_CACHE_MODE
+)
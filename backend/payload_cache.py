@@ -0,0 +1,144 @@
+# payload_cache.py
+
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+from app_init import app, db
+import config
+
+class PayloadCache:
+    """Per-process LRU of encoded quiz-set responses, invalidated across workers and replicas with LISTEN/NOTIFY.
+
+    Each entry belongs to one or more scopes (a quiz set, or one taker's attempt at it). Every write
+    sends a NOTIFY with its scope on `channel` when it commits. Each worker keeps one listening
+    connection and drops the scope's entries when the notification arrives. While that connection
+    is down the cache serves nothing, so a missed notification can never serve stale data.
+    """
+
+    def __init__(self, max_bytes, channel):
+        self.max_bytes = max_bytes
+        self.channel = channel
+        self.entries = OrderedDict()  # key -> (scopes, version, body, headers)
+        self.keys_by_scope = {}
+        self.generations = {}  # scope -> invalidation count, guards against caching a body read before a write
+        self.size = 0
+        self.lock = threading.Lock()
+        self.listening = threading.Event()
+        self.listener_pid = None
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def ensure_listener(self):
+        # Gunicorn forks workers after import, so each process starts its own listener on first use
+        if not self.enabled or self.listener_pid == os.getpid():
+            return
+        with self.lock:
+            if self.listener_pid == os.getpid():
+                return
+            self.listener_pid = os.getpid()
+            self.listening.clear()
+            self.entries.clear()
+            self.keys_by_scope.clear()
+            self.size = 0
+        threading.Thread(target=self.listen, name='payload-cache-listener', daemon=True).start()
+
+    def listen(self):
+        while True:
+            try:
+                with app.app_context():
+                    connection = db.engine.raw_connection()
+                listener = connection.driver_connection
+                connection.detach()  # Keep the long-lived LISTEN connection out of the request pool
+                listener.autocommit = True
+                listener.cursor().execute(f'LISTEN {self.channel}')
+
+                self.clear()
+                self.listening.set()
+                while True:
+                    if select.select([listener], [], [], 30) == ([], [], []):
+                        continue
+                    listener.poll()
+                    while listener.notifies:
+                        self.invalidate(listener.notifies.pop(0).payload)
+            except Exception as e:
+                print(f"Payload cache listener stopped, retrying: {e}")
+                self.listening.clear()
+                self.clear()
+                time.sleep(5)
+
+    def generation(self, scopes):
+        with self.lock:
+            return tuple(self.generations.get(scope, 0) for scope in scopes)
+
+    def get(self, key):
+        if not self.listening.is_set():
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1:]
+
+    def put(self, key, scopes, generation, version, body, headers):
+        if not self.listening.is_set() or len(body) > self.max_bytes:
+            return
+        with self.lock:
+            # An invalidation since the caller started reading means the body may predate the write
+            if tuple(self.generations.get(scope, 0) for scope in scopes) != generation:
+                return
+            self.discard(key)
+            self.entries[key] = (scopes, version, body, headers)
+            for scope in scopes:
+                self.keys_by_scope.setdefault(scope, set()).add(key)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self.discard(next(iter(self.entries)))
+
+    def discard(self, key):
+        # Caller holds the lock
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= len(entry[2])
+            for scope in entry[0]:
+                keys = self.keys_by_scope.get(scope)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self.keys_by_scope[scope]
+
+    def invalidate(self, scope):
+        with self.lock:
+            self.generations[scope] = self.generations.get(scope, 0) + 1
+            for key in list(self.keys_by_scope.get(scope, ())):
+                self.discard(key)
+
+    def clear(self):
+        with self.lock:
+            for scope in self.generations:
+                self.generations[scope] += 1
+            self.entries.clear()
+            self.keys_by_scope.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'listening': self.listening.is_set(),
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes
+            }
+
+payload_cache = PayloadCache(max_bytes=config.PAYLOAD_CACHE_MAX_BYTES, channel=config.PAYLOAD_CACHE_CHANNEL)
+
+def notify_payloads_changed(scope):
+    # Drop this worker's copy now and tell every other worker once the caller's transaction commits
+    payload_cache.invalidate(scope)
+    if payload_cache.enabled:
+        db.session.execute(text('SELECT pg_notify(:channel, :scope)'), {'channel': payload_cache.channel, 'scope': scope})
@@ -0,0 +1,39 @@
+# plain_text.py
+
+import io
+from html.parser import HTMLParser
+
+# The MLStripper class and strip_tags function
+class MLStripper(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.reset()
+        self.strict = False
+        self.convert_charrefs = True
+        self.text = io.StringIO()
+
+    def handle_data(self, d):
+        self.text.write(d)
+
+    def get_data(self):
+        return self.text.getvalue()
+
+def strip_tags(html):
+    s = MLStripper()
+    s.feed(html)
+    return s.get_data()
+
+def plain_text(html):
+    # Tags removed, entities decoded and whitespace collapsed to single spaces
+    return ' '.join(strip_tags(html).split()) if html else html
+
+def plain_text_columns(text, options, explanation):
+    """The text_plain, options_plain and explanation_plain values stored next to a question's scraped HTML.
+
+    Options are joined one per line, which keeps them in a single text column that full-text search can index.
+    """
+    return {
+        'text_plain': plain_text(text),
+        'options_plain': '\n'.join(plain_text(option) or '' for option in options),
+        'explanation_plain': plain_text(explanation)
+    }
@@ -0,0 +1,138 @@
+# provider_scheduler.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class ProviderHealth:
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None  # Moving average of successful call seconds
+        self.open_until = 0.0  # Circuit is open (provider skipped) until this time
+
+    def success_rate(self):
+        # Smoothed so an untried provider ranks between a reliable and a failing one
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+class ProviderScheduler:
+    """Races LLM providers ordered by health instead of walking them strictly in order.
+
+    The healthiest provider is asked first; if it has not answered within `hedge_delay` seconds the
+    next one is started alongside it (up to `max_parallel` at once), and a failure starts the next
+    one immediately. The first answer wins. A provider that fails `failure_threshold` times in a row
+    is skipped for `cooldown` seconds, after which a single request probes it again.
+    A call still running when the request's deadline passes is counted as a failure of its provider.
+    `call(provider, prompt, timeout)` does the actual request and should give up after `timeout` seconds,
+    so local stub providers can stand in for real ones.
+    """
+
+    def __init__(self, providers, call, hedge_delay, request_timeout, max_parallel, failure_threshold, cooldown, workers):
+        self.providers = list(providers)
+        self.call = call
+        self.hedge_delay = hedge_delay
+        self.request_timeout = request_timeout
+        self.max_parallel = max_parallel
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.health = {provider: ProviderHealth() for provider in self.providers}
+        self.lock = threading.Lock()
+        self.expired = set()  # Calls already counted as timed out, whose late result is ignored
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-provider')
+
+    def ranked(self):
+        now = time.monotonic()
+        with self.lock:
+            available = [provider for provider in self.providers if self.health[provider].open_until <= now]
+            # With every circuit open, trying them all beats failing every request until a cooldown ends
+            candidates = available or list(self.providers)
+            return sorted(candidates, key=lambda provider: (
+                -self.health[provider].success_rate(),
+                self.health[provider].latency if self.health[provider].latency is not None else self.hedge_delay
+            ))
+
+    def start(self, provider, prompt, timeout):
+        with self.lock:
+            health = self.health[provider]
+            if health.consecutive_failures >= self.failure_threshold:
+                # Half-open probe: keep the circuit open for everyone else while this request tests it
+                health.open_until = time.monotonic() + self.cooldown
+        started = time.monotonic()
+        future = self.executor.submit(self.call, provider, prompt, timeout)
+        # A hung provider never finishes on its own, so the deadline counts it as failed
+        timer = threading.Timer(timeout, self.expire, (provider, future, timeout))
+        timer.daemon = True
+        timer.start()
+
+        def finished(done):
+            timer.cancel()
+            self.record(provider, done, time.monotonic() - started)
+        future.add_done_callback(finished)
+        return future
+
+    def expire(self, provider, future, timeout):
+        if future.cancel():
+            return  # Never started, so its provider is not to blame
+        with self.lock:
+            if future.done():
+                return
+            self.expired.add(future)
+            self.failed(provider, f"no answer within {timeout:.0f}s")
+
+    def failed(self, provider, error):
+        health = self.health[provider]
+        health.failures += 1
+        health.consecutive_failures += 1
+        print(f"Error with provider {provider}: {error}")
+        if health.consecutive_failures >= self.failure_threshold:
+            health.open_until = time.monotonic() + self.cooldown
+
+    def record(self, provider, future, seconds):
+        if future.cancelled():
+            return
+        with self.lock:
+            if future in self.expired:
+                self.expired.discard(future)
+                return
+            health = self.health[provider]
+            if future.exception() is None:
+                health.successes += 1
+                health.consecutive_failures = 0
+                health.open_until = 0.0
+                health.latency = seconds if health.latency is None else 0.8 * health.latency + 0.2 * seconds
+            else:
+                self.failed(provider, future.exception())
+
+    def complete(self, prompt):
+        candidates = self.ranked()
+        deadline = time.monotonic() + self.request_timeout
+        running = {self.start(candidates.pop(0), prompt, self.request_timeout)}
+
+        while running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, running = wait(running, timeout=min(self.hedge_delay, remaining), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()  # Slower hedges keep running and still update their provider's health
+
+            # Each failure, or no answer within the hedge delay, brings in the next provider
+            for _ in range(len(done) or 1):
+                if candidates and len(running) < self.max_parallel:
+                    running.add(self.start(candidates.pop(0), prompt, deadline - time.monotonic()))
+
+        raise Exception("All providers failed")
+
+    def stats(self):
+        now = time.monotonic()
+        with self.lock:
+            return [{
+                'provider': getattr(provider, '__name__', str(provider)),
+                'successes': health.successes,
+                'failures': health.failures,
+                'success_rate': round(health.success_rate(), 3),
+                'average_latency_ms': round(health.latency * 1000) if health.latency is not None else None,
+                'circuit_open': health.open_until > now
+            } for provider, health in self.health.items()]
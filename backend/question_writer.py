@@ -0,0 +1,111 @@
+# question_writer.py
+
+import time
+from sqlalchemy import insert, select, func
+from app_init import db
+from models import Question, QuestionLshBand
+from quiz_set_versions import bump_quiz_set_version
+from plain_text import plain_text_columns
+from fingerprints import fingerprint_columns, lsh_band_rows
+import config
+
+class QuestionWriter:
+    """Buffers scraped question rows and writes them with multi-row INSERTs instead of one ORM object per question.
+
+    Use it as a context manager (or call close()) so the last partial batch is written.
+    With `skip_duplicates`, questions whose content hash is already in the quiz set are dropped instead of inserted.
+    """
+
+    def __init__(self, quiz_set_id, progress=None, batch_size=None, skip_duplicates=None):
+        # Ensure `quiz_set_id` is properly passed before any question is buffered
+        if quiz_set_id is None:
+            raise ValueError("`quiz_set_id` is missing for the scraped questions")
+        self.quiz_set_id = quiz_set_id
+        self.progress = progress
+        self.batch_size = batch_size or config.SCRAPE_INSERT_BATCH_SIZE
+        if skip_duplicates is None:
+            # Scrape jobs choose per request; other writers follow SCRAPE_SKIP_DUPLICATES
+            skip_duplicates = progress.skip_duplicates if progress else config.SCRAPE_SKIP_DUPLICATES
+        self.skip_duplicates = skip_duplicates
+        self.rows = []
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.insert_seconds = 0.0
+
+    def add(self, order, text, options, answer, url, explanation, discussion_link):
+        plain = plain_text_columns(text, options, explanation)
+        self.rows.append({
+            'quiz_set_id': self.quiz_set_id,
+            'order': order,
+            'text': text,
+            'options': options,
+            'answer': answer,
+            'url': url,
+            'explanation': explanation,
+            'discussion_link': discussion_link,
+            **plain,
+            **fingerprint_columns(text, options, plain['text_plain'], plain['options_plain'])
+        })
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+
+        start = time.perf_counter()
+        rows = self.without_duplicates(self.rows) if self.skip_duplicates else self.rows
+        if rows:
+            question_ids = db.session.execute(
+                insert(Question).returning(Question.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            band_rows = [band for question_id, row in zip(question_ids, rows) for band in lsh_band_rows(question_id, row['minhash'])]
+            if band_rows:
+                db.session.execute(insert(QuestionLshBand), band_rows)
+            bump_quiz_set_version(self.quiz_set_id)
+        db.session.commit()
+        elapsed = time.perf_counter() - start
+
+        count = len(rows)
+        skipped = len(self.rows) - count
+        self.rows = []
+        self.rows_written += count
+        self.rows_skipped += skipped
+        self.insert_seconds += elapsed
+        print(f"Inserted {count} questions for quiz set {self.quiz_set_id} ({self.rows_per_second():.0f} rows/s)"
+              + (f", skipped {skipped} duplicates" if skipped else ""))
+        if self.progress:
+            self.progress.rows_inserted(count, elapsed, skipped)
+
+    def without_duplicates(self, rows):
+        # Held until commit, so URL sets of one quiz set scraped at once cannot both insert the same question
+        db.session.execute(select(func.pg_advisory_xact_lock(func.hashtext('question_writer'), func.hashtext(self.quiz_set_id))))
+        hashes = {row['content_hash'] for row in rows if row['content_hash']}
+        seen = set(db.session.execute(
+            select(Question.content_hash).where(Question.quiz_set_id == self.quiz_set_id, Question.content_hash.in_(hashes))
+        ).scalars())
+
+        new_rows = []
+        for row in rows:
+            # Questions too short to fingerprint are always kept
+            if row['content_hash'] is None:
+                new_rows.append(row)
+            elif row['content_hash'] not in seen:
+                seen.add(row['content_hash'])
+                new_rows.append(row)
+        return new_rows
+
+    def rows_per_second(self):
+        return self.rows_written / self.insert_seconds if self.insert_seconds else 0.0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            db.session.rollback()
@@ -0,0 +1,108 @@
+# quiz_pdf.py
+
+import glob
+import os
+import threading
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from sqlalchemy import select
+from app_init import db
+from models import Question
+from plain_text import strip_tags
+import config
+
+def render_quiz_pdf(quiz_set_id, title, path):
+    # Questions are streamed in batches as plain columns, so a large set never sits in memory as ORM objects
+    rows = db.session.execute(
+        select(Question.text, Question.options, Question.answer, Question.text_plain, Question.options_plain)
+        .where(Question.quiz_set_id == quiz_set_id)
+        .order_by(Question.order)
+        .execution_options(yield_per=config.PDF_QUESTION_BATCH_SIZE)
+    )
+
+    p = canvas.Canvas(path, pagesize=letter, pageCompression=1)
+    width, height = letter
+
+    y_position = height - 30
+    p.drawString(30, y_position, f"Quiz: {title}")
+    y_position -= 20
+
+    for i, (question_text, options, answer, text_plain, options_plain) in enumerate(rows, start=1):
+        # Plain text is stored at scrape time; only rows not yet backfilled are stripped here
+        if text_plain is None:
+            text_plain = strip_tags(question_text)
+        if options_plain is None:
+            options = [strip_tags(option) for option in options]
+        else:
+            # splitlines() drops trailing empty (image-only) options, so pad back to the stored option count
+            option_lines = options_plain.splitlines()
+            options = option_lines + [''] * (len(options) - len(option_lines))
+
+        y_position -= 15
+        p.drawString(30, y_position, f"Question No. {i}: {text_plain}")
+        y_position -= 15
+
+        for j, option in enumerate(options, start=1):
+            p.drawString(30, y_position, f"{chr(64+j)}. {option}")  # Adjusted x-coordinate to 30
+            y_position -= 15
+
+        correct_answer = answer.replace("Option ", "")
+        p.drawString(30, y_position, f"Answer: {correct_answer}")  # Adjusted x-coordinate to 30
+        y_position -= 20
+
+        if y_position < 50:
+            p.showPage()
+            y_position = height - 30
+
+    p.save()
+
+class PdfCache:
+    """Rendered quiz PDFs on disk, one file per quiz set version.
+
+    Any change to a quiz set bumps its version, so an existing file is always current and is
+    served as is; a new version is rendered to a spill file, renamed into place and replaces
+    the files of older versions.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def path(self, quiz_set_id, version):
+        return os.path.join(self.directory, f"{quiz_set_id}-{version}.pdf")
+
+    def get(self, quiz_set):
+        path = self.path(quiz_set.id, quiz_set.version)
+        if os.path.exists(path):
+            return path
+
+        with self.lock:
+            render_lock = self.locks.setdefault(path, threading.Lock())
+        # Concurrent downloads of the same new version wait for one render instead of each doing it
+        with render_lock:
+            try:
+                if not os.path.exists(path):
+                    os.makedirs(self.directory, exist_ok=True)
+                    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    try:
+                        render_quiz_pdf(quiz_set.id, quiz_set.title, temp_path)
+                        os.replace(temp_path, path)
+                    finally:
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
+                    self.remove(quiz_set.id, keep=path)
+            finally:
+                with self.lock:
+                    self.locks.pop(path, None)
+        return path
+
+    def remove(self, quiz_set_id, keep=None):
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(quiz_set_id)}-*.pdf")):
+            if path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+pdf_cache = PdfCache(config.PDF_CACHE_DIR)
@@ -0,0 +1,69 @@
+# quiz_set_versions.py
+
+from functools import wraps
+from flask import request, make_response
+from sqlalchemy import and_
+from app_init import db
+from models import QuizSet, Attempt
+from payload_cache import payload_cache, notify_payloads_changed
+from attempts import current_taker_id, attempt_scope, TAKER_HEADER
+
+def bump_quiz_set_version(quiz_set_id):
+    # Increment in SQL so concurrent writers never lose a bump; committed with the caller's transaction
+    QuizSet.query.filter_by(id=quiz_set_id).update({QuizSet.version: QuizSet.version + 1}, synchronize_session=False)
+    notify_payloads_changed(quiz_set_id)
+
+def get_quiz_set_version(quiz_set_id, taker_id):
+    # The quiz set's version and the taker's attempt version (0 before their first answer), or None for an unknown set
+    row = db.session.query(QuizSet.version, Attempt.version) \
+        .outerjoin(Attempt, and_(Attempt.quiz_set_id == QuizSet.id, Attempt.taker_id == taker_id)) \
+        .filter(QuizSet.id == quiz_set_id).first()
+    return f"{row[0]}.{row[1] or 0}" if row else None
+
+def quiz_set_etag(quiz_set_id, version):
+    return f"{quiz_set_id}-{version}"
+
+def conditional_on_quiz_set(view):
+    """Serve a quiz-set read endpoint with an ETag and answer a matching If-None-Match with 304.
+
+    The version is read before the view runs, so a write that lands in between can only make
+    the cached body newer than its ETag, which costs the client one extra download, never a stale page.
+    Encoded 200 bodies are kept in the payload cache, so repeat reads skip the database entirely.
+    Responses include the taker's answers, so both the ETag and the cache entry are per taker.
+    """
+    @wraps(view)
+    def wrapper(quiz_set_id, *args, **kwargs):
+        payload_cache.ensure_listener()
+        taker_id = current_taker_id()
+        key = (quiz_set_id, taker_id, request.endpoint, request.query_string)
+        scopes = (quiz_set_id, attempt_scope(quiz_set_id, taker_id))
+        cached = payload_cache.get(key)
+        if cached:
+            version, body, headers = cached
+            etag = quiz_set_etag(quiz_set_id, version)
+            response = make_response('', 304) if request.if_none_match.contains(etag) else make_response(body, 200, headers)
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            response.vary.add(TAKER_HEADER)
+            return response
+
+        generation = payload_cache.generation(scopes)
+        version = get_quiz_set_version(quiz_set_id, taker_id)
+        if version is None:
+            return view(quiz_set_id, *args, **kwargs)
+
+        etag = quiz_set_etag(quiz_set_id, version)
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(quiz_set_id, *args, **kwargs))
+            if response.status_code != 200:
+                return response
+            headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+            payload_cache.put(key, scopes, generation, version, response.get_data(), headers)
+
+        response.set_etag(etag)
+        response.cache_control.no_cache = True  # Browsers must revalidate, which is a cheap 304 while the set is unchanged
+        response.vary.add(TAKER_HEADER)
+        return response
+    return wrapper
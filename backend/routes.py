@@ -2,51 +2,27 @@
 
 from app_init import app, db
 from flask import request, jsonify, session, send_file
-from models import QuizSet, Question, EditorContent, FurtherExplanation
-from scraping_helpers import process_question, process_pinoybix_question, process_examveda_question, process_examprimer_question, fetch_discussion_comments
+from models import QuizSet, Question, QuestionLshBand, EditorContent, FurtherExplanation, ScrapeJob, Attempt, AttemptPosition, Answer, ExplanationJob, SEARCH_CONFIG
+from scraping_helpers import fetch_discussion_comments
+from scrape_jobs import start_scrape_job, serialize_scrape_job
+from scraper_http import http_client
+from page_cache import page_cache
+from payload_cache import notify_payloads_changed
+from quiz_set_versions import bump_quiz_set_version, conditional_on_quiz_set
+from selection_writer import write_selections, selection_buffer, validate_selection, InvalidSelection
+from attempts import current_taker_id, attempt_id_of, ensure_attempts, bump_attempt_versions, shuffle_seed_of, store_shuffle, with_taker_positions
 import config
 import random
-from g4f import Provider, models
-from langchain.llms.base import LLM
-from langchain_g4f import G4FLLM
+from datetime import datetime
+from sqlalchemy import func, update, and_, select
+from sqlalchemy.dialects.postgresql import insert
+from explanations import build_explanation_prompt, explanation_cache, provider_scheduler
+from explanation_jobs import start_explanation_job, serialize_explanation_job
 import json
 from selenium.webdriver.chrome.options import Options
 from selenium import webdriver
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from html.parser import HTMLParser
-import io
-
-providers_to_try = [
-    Provider.Bing,
-    Provider.ChatBase,
-    Provider.ChatgptAi,
-    Provider.FreeGpt,
-    Provider.GPTalk,
-    Provider.GptForLove,
-    Provider.GptGo,
-    Provider.You,
-]
-
-# The MLStripper class and strip_tags function
-class MLStripper(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.reset()
-        self.strict = False
-        self.convert_charrefs = True
-        self.text = io.StringIO()
-
-    def handle_data(self, d):
-        self.text.write(d)
-
-    def get_data(self):
-        return self.text.getvalue()
-
-def strip_tags(html):
-    s = MLStripper()
-    s.feed(html)
-    return s.get_data()
+from quiz_pdf import pdf_cache
+from fingerprints import near_duplicate_clusters, describe_clusters
 
 @app.route('/api', methods=['GET'])
 def home():
@@ -60,64 +36,85 @@ def start_scraping():
     db.session.add(new_quiz_set)  # Add the new quiz set to the database
     db.session.commit()  # Commit the changes to generate an ID for the quiz set
 
-    global_question_counter = 1  # Initialize the global question counter
+    # Scraping runs in the background; clients poll /api/scrapeJobs/<job_id> for progress
+    skip_duplicates = bool(data.get('skip_duplicates', config.SCRAPE_SKIP_DUPLICATES))
+    job = start_scrape_job(new_quiz_set.id, data['urls'], skip_duplicates)
 
-    # Sequentially process each URL set to maintain order and ensure no overlaps
-    for url_set in data['urls']:
-        if isinstance(url_set, dict):
-            base_url = url_set.get('base_url', '')  # Extract the base URL
+    return jsonify({"message": "Scraping started.", "quiz_set_id": str(new_quiz_set.id), "job_id": job.id}), 202
 
-            if 'indiabix' in base_url:
-                start_url = int(url_set.get('start_url', 1))
-                end_url = int(url_set.get('end_url', start_url))
-                for url_number in range(start_url, end_url + 1):
-                    global_question_counter = process_question(base_url, url_number, global_question_counter, new_quiz_set.id)  # Passing quiz_set_id
+@app.route('/api/scrapeJobs/<string:job_id>', methods=['GET'])
+def get_scrape_job(job_id):
+    job = ScrapeJob.query.get(job_id)
+    if not job:
+        return jsonify({'message': 'Scrape job not found'}), 404
+    return jsonify(serialize_scrape_job(job)), 200
 
-            elif 'pinoybix' in base_url:
-                global_question_counter = process_pinoybix_question(base_url, global_question_counter, new_quiz_set.id, db, Question)  # Passing quiz_set_id
+@app.route('/api/scraperHttpStats', methods=['GET'])
+def get_scraper_http_stats():
+    return jsonify({**http_client.stats(), 'page_cache': page_cache.stats()}), 200
 
-            elif 'examveda' in base_url:
-                start_page = int(url_set.get('start_page', 1))
-                end_page = int(url_set.get('end_page', 10))
-                global_question_counter = process_examveda_question(base_url, start_page, end_page, global_question_counter, new_quiz_set.id, db, Question)  # Passing quiz_set_id
+@app.route('/api/llmProviderStats', methods=['GET'])
+def get_llm_provider_stats():
+    return jsonify(provider_scheduler.stats()), 200
 
-            elif 'web.archive.org' in base_url:
-                global_question_counter = process_examprimer_question(base_url, global_question_counter, new_quiz_set.id, db, Question)  # Passing quiz_set_id
+# Fields a client can ask for with getQuestionsByQuizSet?fields=...
+QUESTION_LIST_FIELDS = ('id', 'order', 'text', 'options', 'answer', 'url', 'explanation', 'discussion_link', 'favorite', 'user_selected_option')
 
-        elif isinstance(url_set, str):
-            if "pinoybix" in url_set:
-                global_question_counter = process_pinoybix_question(url_set, global_question_counter, new_quiz_set.id, db, Question)  # Passing quiz_set_id
-            elif "indiabix" in url_set:
-                global_question_counter = process_question(url_set, global_question_counter, new_quiz_set.id)  # Passing quiz_set_id
-            elif "examveda" in url_set:
-                global_question_counter = process_examveda_question(url_set, 1, 10, global_question_counter, new_quiz_set.id, db, Question)  # Passing quiz_set_id
-            elif "web.archive.org" in url_set:
-                global_question_counter = process_examprimer_question(url_set, global_question_counter, new_quiz_set.id, db, Question)  # Passing quiz_set_id
+def question_list_column(field):
+    # favorite and user_selected_option are the current taker's, from the outer-joined Answer row
+    if field == 'favorite':
+        return func.coalesce(Answer.favorite, False).label('favorite')
+    if field == 'user_selected_option':
+        return Answer.selected_option.label('user_selected_option')
+    return getattr(Question, field)
 
-        db.session.commit()  # After processing each URL set, commit the changes
-
-    # Return a success message
-    return jsonify({"message": "Scraping completed.", "quiz_set_id": str(new_quiz_set.id)}), 200
+def with_taker_answers(query, quiz_set_id, taker_id):
+    return query.outerjoin(Answer, and_(Answer.question_id == Question.id, Answer.attempt_id == attempt_id_of(quiz_set_id, taker_id)))
 
 @app.route('/api/getQuestionsByQuizSet/<string:quiz_set_id>', methods=['GET'])
+@conditional_on_quiz_set
 def get_questions_by_quiz_set(quiz_set_id):
-    print(f"Fetching questions for Quiz Set ID: {quiz_set_id}")  # Debug log
-    questions = Question.query.filter_by(quiz_set_id=quiz_set_id).order_by(Question.order).all()
-
-    print(f"Found {len(questions)} questions for Quiz Set ID: {quiz_set_id}")  # Debugging: check number of questions found
+    # Optional keyset pagination (?limit=&after=<order>) and projection (?fields=text,options)
+    fields = QUESTION_LIST_FIELDS
+    if request.args.get('fields'):
+        requested = [field.strip() for field in request.args['fields'].split(',') if field.strip()]
+        unknown = sorted(set(requested) - set(QUESTION_LIST_FIELDS))
+        if unknown:
+            return jsonify({'message': f"Unknown fields: {', '.join(unknown)}"}), 400
+        # id and order are always returned so clients can key questions and page on them
+        fields = ['id', 'order'] + [field for field in requested if field not in ('id', 'order')]
+
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after', type=int)
+    if limit is not None and not 0 < limit <= config.MAX_QUESTIONS_PAGE_SIZE:
+        return jsonify({'message': f"limit must be between 1 and {config.MAX_QUESTIONS_PAGE_SIZE}"}), 400
 
-    return jsonify([{
-        'id': question.id,
-        'order': question.order,  # Include the order field
-        'text': question.text,
-        'options': question.options,
-        'answer': question.answer,
-        'url': question.url,
-        'explanation': question.explanation,
-        'discussion_link': question.discussion_link,
-        'favorite': question.favorite,
-        'user_selected_option': question.user_selected_option
-    } for question in questions])
+    print(f"Fetching questions for Quiz Set ID: {quiz_set_id}")  # Debug log
+    taker_id = current_taker_id()
+    # A shuffled taker's order is their stored position, which is also what ?after= pages on
+    shuffled = shuffle_seed_of(quiz_set_id, taker_id) is not None
+    order = AttemptPosition.position if shuffled else Question.order
+    columns = [order.label('order') if field == 'order' else question_list_column(field) for field in fields]
+    query = db.session.query(*columns).select_from(Question).filter(Question.quiz_set_id == quiz_set_id)
+    if shuffled:
+        query = with_taker_positions(query, quiz_set_id, taker_id)
+    if 'favorite' in fields or 'user_selected_option' in fields:
+        query = with_taker_answers(query, quiz_set_id, taker_id)
+    if after is not None:
+        query = query.filter(order > after)
+    query = query.order_by(order)
+
+    # Fetch one extra row to know whether another page follows
+    rows = query.limit(limit + 1).all() if limit else query.all()
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if limit else rows
+
+    print(f"Found {len(rows)} questions for Quiz Set ID: {quiz_set_id}")  # Debugging: check number of questions found
+
+    response = jsonify([row._asdict() for row in rows])
+    if has_more:
+        response.headers['X-Next-Cursor'] = str(rows[-1].order)
+    return response
 
 @app.route('/api/getQuizSets', methods=['GET'])
 def get_quiz_sets():
@@ -127,16 +124,143 @@ def get_quiz_sets():
         'title': quiz_set.title
     } for quiz_set in quiz_sets])
 
+# Sort keys accepted by getQuizSetSummaries?sort=...
+QUIZ_SET_SUMMARY_SORTS = ('title', 'total_questions', 'answered_questions', 'correct_answers', 'progress')
+
+@app.route('/api/getQuizSetSummaries', methods=['GET'])
+def get_quiz_set_summaries():
+    # Everything the dashboard shows for each set, from one grouped query instead of a request per set
+    sort = request.args.get('sort', 'title')
+    direction = request.args.get('order', 'asc')
+    limit = request.args.get('limit', default=config.MAX_QUIZ_SET_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', default=0, type=int)
+    if sort not in QUIZ_SET_SUMMARY_SORTS:
+        return jsonify({'message': f"sort must be one of {', '.join(QUIZ_SET_SUMMARY_SORTS)}"}), 400
+    if direction not in ('asc', 'desc'):
+        return jsonify({'message': "order must be asc or desc"}), 400
+    if not 0 < limit <= config.MAX_QUIZ_SET_PAGE_SIZE or offset < 0:
+        return jsonify({'message': f"limit must be between 1 and {config.MAX_QUIZ_SET_PAGE_SIZE} and offset at least 0"}), 400
+
+    total_questions = func.count(Question.id)
+    answered_questions = func.count(Answer.selected_option)
+    correct_answers = func.count(Question.id).filter(Answer.selected_option == Question.answer)
+    progress = func.coalesce(func.round(answered_questions * 100.0 / func.nullif(total_questions, 0)), 0)
+    columns = {
+        'title': QuizSet.title,
+        'total_questions': total_questions,
+        'answered_questions': answered_questions,
+        'correct_answers': correct_answers,
+        'progress': progress
+    }
+    sort_column = columns[sort].desc() if direction == 'desc' else columns[sort].asc()
+
+    rows = db.session.query(
+        QuizSet.id, QuizSet.title, QuizSet.lock_state, QuizSet.eye_icon_state,
+        total_questions.label('total_questions'),
+        answered_questions.label('answered_questions'),
+        correct_answers.label('correct_answers'),
+        progress.label('progress')
+    ).outerjoin(Question, Question.quiz_set_id == QuizSet.id) \
+        .outerjoin(Attempt, and_(Attempt.quiz_set_id == QuizSet.id, Attempt.taker_id == current_taker_id())) \
+        .outerjoin(Answer, and_(Answer.attempt_id == Attempt.id, Answer.question_id == Question.id)) \
+        .group_by(QuizSet.id) \
+        .order_by(sort_column, QuizSet.id) \
+        .limit(limit).offset(offset).all()
+
+    response = jsonify([{**row._asdict(), 'progress': int(row.progress)} for row in rows])
+    response.headers['X-Total-Count'] = str(db.session.query(func.count(QuizSet.id)).scalar())
+    return response
+
+@app.route('/api/search', methods=['GET'])
+def search_questions():
+    # Ranked full-text search over the stored plain text, answered from the GIN index on question.search_vector
+    terms = request.args.get('q', '').strip()
+    quiz_set_id = request.args.get('quiz_set_id')
+    favorites_only = request.args.get('favorites', 'false').lower() == 'true'
+    limit = request.args.get('limit', default=20, type=int)
+    offset = request.args.get('offset', default=0, type=int)
+    if not terms:
+        return jsonify({'message': 'q is required'}), 400
+    if not 0 < limit <= config.MAX_SEARCH_PAGE_SIZE or offset < 0:
+        return jsonify({'message': f"limit must be between 1 and {config.MAX_SEARCH_PAGE_SIZE} and offset at least 0"}), 400
+
+    # websearch_to_tsquery accepts what people type ("quoted phrases", or, -excluded) and never raises a syntax error
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, terms)
+    rank = func.ts_rank(Question.search_vector, ts_query)
+    favorite = func.coalesce(Answer.favorite, False)
+
+    query = db.session.query(Question.id) \
+        .outerjoin(Attempt, and_(Attempt.quiz_set_id == Question.quiz_set_id, Attempt.taker_id == current_taker_id())) \
+        .outerjoin(Answer, and_(Answer.attempt_id == Attempt.id, Answer.question_id == Question.id)) \
+        .filter(Question.search_vector.op('@@')(ts_query))
+    if quiz_set_id:
+        query = query.filter(Question.quiz_set_id == quiz_set_id)
+    if favorites_only:
+        query = query.filter(Answer.favorite)
+    total = query.count()
+
+    rows = query.join(QuizSet, QuizSet.id == Question.quiz_set_id) \
+        .with_entities(
+            Question.id, Question.quiz_set_id, QuizSet.title.label('quiz_set_title'), Question.order,
+            Question.text_plain, Question.options_plain, Question.answer, favorite.label('favorite'),
+            # Only computed for the returned page, after the sort and limit
+            func.ts_headline(SEARCH_CONFIG, Question.text_plain, ts_query, 'StartSel=<mark>, StopSel=</mark>').label('headline'),
+            rank.label('rank')
+        ) \
+        .order_by(rank.desc(), Question.id) \
+        .limit(limit).offset(offset).all()
+
+    response = jsonify([{
+        'id': row.id,
+        'quiz_set_id': row.quiz_set_id,
+        'quiz_set_title': row.quiz_set_title,
+        'order': row.order,
+        'text': row.text_plain,
+        'options': row.options_plain.split('\n') if row.options_plain else [],
+        'answer': row.answer,
+        'favorite': row.favorite,
+        'headline': row.headline,
+        'rank': round(row.rank, 4)
+    } for row in rows])
+    response.headers['X-Total-Count'] = str(total)
+    return response
+
+@app.route('/api/nearDuplicates', methods=['GET'])
+def get_near_duplicates():
+    # Clusters of near-identical questions touching ?quiz_set_id= that are also stored in other quiz sets
+    threshold = request.args.get('threshold', default=config.NEAR_DUPLICATE_THRESHOLD, type=float)
+    quiz_set_id = request.args.get('quiz_set_id')
+    if not quiz_set_id:
+        # The report over every quiz set is too large for a request; it runs as `flask report-near-duplicates`
+        return jsonify({'message': 'quiz_set_id is required'}), 400
+    if not 0 < threshold <= 1:
+        return jsonify({'message': 'threshold must be greater than 0 and at most 1'}), 400
+
+    clusters = near_duplicate_clusters(threshold, quiz_set_id)
+    clusters.sort(key=len, reverse=True)
+    return jsonify({'threshold': threshold, 'clusters': describe_clusters(clusters)}), 200
+
 @app.route('/api/deleteQuizSet/<string:quiz_set_id>', methods=['DELETE'])
 def delete_quiz_set(quiz_set_id):
     quiz_set = db.session.query(QuizSet).get(quiz_set_id)
     if not quiz_set:
         return jsonify({'message': 'Quiz set not found'}), 404
 
-    # Delete related questions first
+    # Delete related answers, attempts, explanations, LSH bands, questions and jobs first
+    attempt_ids = select(Attempt.id).where(Attempt.quiz_set_id == quiz_set_id)
+    question_ids = select(Question.id).where(Question.quiz_set_id == quiz_set_id)
+    Answer.query.filter(Answer.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
+    AttemptPosition.query.filter(AttemptPosition.attempt_id.in_(attempt_ids)).delete(synchronize_session=False)
+    Attempt.query.filter_by(quiz_set_id=quiz_set_id).delete()
+    FurtherExplanation.query.filter(FurtherExplanation.question_id.in_(question_ids)).delete(synchronize_session=False)
+    QuestionLshBand.query.filter(QuestionLshBand.question_id.in_(question_ids)).delete(synchronize_session=False)
     Question.query.filter_by(quiz_set_id=quiz_set_id).delete()
+    ScrapeJob.query.filter_by(quiz_set_id=quiz_set_id).delete()
+    ExplanationJob.query.filter_by(quiz_set_id=quiz_set_id).delete()
     db.session.delete(quiz_set)
+    notify_payloads_changed(quiz_set_id)
     db.session.commit()
+    pdf_cache.remove(quiz_set_id)
     
     return jsonify({'message': f'Quiz set {quiz_set_id} deleted successfully'}), 200
 
@@ -147,6 +271,7 @@ def rename_quiz_set(quiz_set_id):
     quiz_set = db.session.query(QuizSet).get(quiz_set_id)
     if quiz_set:
         quiz_set.title = new_title
+        bump_quiz_set_version(quiz_set_id)
         db.session.commit()
         return jsonify({'message': 'Quiz set title updated successfully'}), 200
     return jsonify({'message': 'Quiz set not found'}), 
@@ -157,46 +282,81 @@ def get_questions():
     return jsonify([{...} for question in questions])  # Unchanged
 
 @app.route('/api/getFavorites/<string:quiz_set_id>', methods=['GET'])
+@conditional_on_quiz_set
 def get_favorites(quiz_set_id):
-    favorites = Question.query.filter_by(quiz_set_id=quiz_set_id, favorite=True).all()
-    favorites_list = [{
-        'id': question.id,
-        'text': question.text,
-        'options': question.options,
-        'answer': question.answer,
-        'url': question.url,
-        'explanation': question.explanation,
-        'discussion_link': question.discussion_link,
-        'favorite': question.favorite
-    } for question in favorites]
+    taker_id = current_taker_id()
+    favorites = db.session.query(
+        Question.id, Question.text, Question.options, Question.answer, Question.url, Question.explanation, Question.discussion_link
+    ).join(Answer, Answer.question_id == Question.id) \
+        .filter(Answer.attempt_id == attempt_id_of(quiz_set_id, taker_id), Answer.favorite)
+    if shuffle_seed_of(quiz_set_id, taker_id):
+        favorites = with_taker_positions(favorites, quiz_set_id, taker_id).order_by(AttemptPosition.position).all()
+    else:
+        favorites = favorites.order_by(Question.order).all()
+    favorites_list = [{**question._asdict(), 'favorite': True} for question in favorites]
     return jsonify(favorites_list)
 
 @app.route('/api/toggleFavorite', methods=['POST'])
 def toggle_favorite():
     data = request.json
     question_id = data['question_id']
-    question = db.session.query(Question).get(question_id)
-    if question:
-        question.favorite = not question.favorite
+    quiz_set_id = db.session.query(Question.quiz_set_id).filter_by(id=question_id).scalar()
+    if quiz_set_id:
+        taker_id = current_taker_id()
+        attempt_id = ensure_attempts(taker_id, [quiz_set_id])[quiz_set_id]
+        db.session.execute(
+            insert(Answer).values(attempt_id=attempt_id, question_id=question_id, favorite=True)
+            .on_conflict_do_update(index_elements=[Answer.attempt_id, Answer.question_id], set_={'favorite': ~Answer.favorite})
+        )
+        bump_attempt_versions(taker_id, [quiz_set_id])
         db.session.commit()
     return jsonify({"message": "Favorite toggled"}), 200
 
 @app.route('/api/updateUserSelection', methods=['POST'])
 def update_user_selection():
-    data = request.json
-    question_id = data['question_id']
-    selected_option = data['selected_option']  # Can be None for deselection
-    question = db.session.query(Question).get(question_id)
-    if question:
-        question.user_selected_option = selected_option
-        db.session.commit()
+    data = request.get_json(silent=True) or {}
+    try:
+        # selected_option can be None for deselection
+        question_id, selected_option = validate_selection(data.get('question_id'), data.get('selected_option'))
+    except InvalidSelection as e:
+        return jsonify({"message": str(e)}), 400
+    if config.SELECTION_WRITE_BEHIND:
+        selection_buffer.add(current_taker_id(), {question_id: selected_option})
+        return jsonify({"message": "User selection queued"}), 202
+
+    if write_selections(current_taker_id(), {question_id: selected_option}):
         return jsonify({"message": "User selection updated"}), 200
     return jsonify({"message": "Question not found"}), 404
 
+@app.route('/api/updateUserSelections', methods=['POST'])
+def update_user_selections():
+    # Many answers in one request and one commit: {"selections": [{"question_id": 1, "selected_option": "Option A"}, ...]}
+    data = request.get_json(silent=True) or {}
+    selections = {}
+    for item in data.get('selections') or []:
+        if not isinstance(item, dict):
+            return jsonify({"message": "Each selection needs a question_id and a selected_option"}), 400
+        try:
+            question_id, selected_option = validate_selection(item.get('question_id'), item.get('selected_option'))
+        except InvalidSelection as e:
+            return jsonify({"message": str(e)}), 400
+        selections[question_id] = selected_option  # Later answers to the same question win
+    if not selections:
+        return jsonify({"message": "No selections provided"}), 400
+
+    if config.SELECTION_WRITE_BEHIND:
+        selection_buffer.add(current_taker_id(), selections)
+        return jsonify({"message": "User selections queued", "queued": len(selections)}), 202
+
+    updated = write_selections(current_taker_id(), selections)
+    return jsonify({"message": "User selections updated", "updated": updated}), 200
+
 @app.route('/api/getUserSelections/<string:quiz_set_id>', methods=['GET'])
+@conditional_on_quiz_set
 def get_user_selections(quiz_set_id):
-    questions = Question.query.filter_by(quiz_set_id=quiz_set_id).all()
-    selections = {question.id: question.user_selected_option for question in questions}
+    questions = with_taker_answers(db.session.query(Question.id, Answer.selected_option), quiz_set_id, current_taker_id()) \
+        .filter(Question.quiz_set_id == quiz_set_id).all()
+    selections = {question_id: selected_option for question_id, selected_option in questions}
     return jsonify(selections)
 
 @app.route('/api/updateScore', methods=['POST'])
@@ -231,93 +391,118 @@ def get_score(quiz_set_id):
 
     return jsonify({"score": session['scores'][quiz_set_id]}), 200
 
+def clear_taker_selections(quiz_set_id, taker_id):
+    # Reset the taker's answers to the set and return the ids of the questions they keep as favorites
+    rows = db.session.execute(
+        update(Answer)
+        .where(Answer.attempt_id == attempt_id_of(quiz_set_id, taker_id))
+        .values(selected_option=None)
+        .returning(Answer.question_id, Answer.favorite)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if rows:
+        bump_attempt_versions(taker_id, [quiz_set_id])
+    return {question_id for question_id, favorite in rows if favorite}
+
 @app.route('/api/shuffleQuestions/<string:quiz_set_id>', methods=['POST'])
 def shuffle_questions(quiz_set_id):
-    questions = Question.query.filter_by(quiz_set_id=quiz_set_id).all()
-    if not questions:
+    # Shuffles the set for the calling taker only; their permutation is stored once and read back by position.
+    # The same seed always produces the same order; one is generated when the client sends none
+    data = request.get_json(silent=True) or {}
+    seed = str(data.get('seed') or request.args.get('seed') or f"{random.getrandbits(64):016x}")
+    if len(seed) > 64:
+        return jsonify({'message': 'seed must be at most 64 characters'}), 400
+    if not db.session.query(Question.id).filter_by(quiz_set_id=quiz_set_id).first():
         return jsonify({'message': 'No questions found for this quiz set'}), 404
-    
-    question_ids = [q.id for q in questions]
-    random.shuffle(question_ids)
 
-    for new_order, question_id in enumerate(question_ids):
-        question = next(q for q in questions if q.id == question_id)
-        question.order = new_order
-        question.user_selected_option = None  # Reset user selection
-    
+    taker_id = current_taker_id()
+    attempt_id = ensure_attempts(taker_id, [quiz_set_id])[quiz_set_id]
+    store_shuffle(attempt_id, quiz_set_id, seed)
+    favorites = clear_taker_selections(quiz_set_id, taker_id)
+    bump_attempt_versions(taker_id, [quiz_set_id])
     db.session.commit()
 
-    shuffled_questions = Question.query.filter_by(quiz_set_id=quiz_set_id).order_by(Question.order).all()
-    return jsonify([{
-        'id': question.id,
-        'order': question.order,  # Include the order field
-        'text': question.text,
-        'options': question.options,
-        'answer': question.answer,
-        'quiz_set_id': question.quiz_set_id,
-        'favorite': question.favorite,
-        'url': question.url,
-        'explanation': question.explanation,
-        'discussion_link': question.discussion_link,
-        'user_selected_option': question.user_selected_option
-    } for question in shuffled_questions]), 200
+    rows = db.session.query(
+        Question.id, AttemptPosition.position.label('order'), Question.text, Question.options,
+        Question.answer, Question.quiz_set_id, Question.url, Question.explanation, Question.discussion_link
+    ).join(AttemptPosition, AttemptPosition.question_id == Question.id) \
+        .filter(AttemptPosition.attempt_id == attempt_id).order_by(AttemptPosition.position).all()
+
+    response = jsonify([{**row._asdict(), 'favorite': row.id in favorites, 'user_selected_option': None} for row in rows])
+    response.headers['X-Shuffle-Seed'] = seed
+    return response, 200
 
 @app.route('/api/resetQuestions/<string:quiz_set_id>', methods=['POST'])
 def reset_questions(quiz_set_id):
-    questions = Question.query.filter_by(quiz_set_id=quiz_set_id).order_by(Question.order).all()
+    taker_id = current_taker_id()
+    if shuffle_seed_of(quiz_set_id, taker_id):
+        questions = db.session.query(Question, AttemptPosition.position).select_from(Question).filter(Question.quiz_set_id == quiz_set_id)
+        questions = with_taker_positions(questions, quiz_set_id, taker_id).order_by(AttemptPosition.position).all()
+    else:
+        questions = [(question, question.order) for question in
+                     Question.query.filter_by(quiz_set_id=quiz_set_id).order_by(Question.order).all()]
     if not questions:
         return jsonify({'message': 'No questions found for this quiz set'}), 404
     
-    for question in questions:
-        question.user_selected_option = None  # Reset user selection
-    
+    # Only the current taker's selections are reset; other takers of the set keep theirs
+    favorites = clear_taker_selections(quiz_set_id, taker_id)
     db.session.commit()
 
-    # Return the questions in their original order with necessary fields
+    # Return the questions in the taker's order (shuffled takers keep their shuffle) with necessary fields
     return jsonify([{
         'id': question.id,
-        'order': question.order,
+        'order': order,
         'text': question.text,
         'options': question.options,
         'answer': question.answer,
         'quiz_set_id': question.quiz_set_id,
-        'favorite': question.favorite,
+        'favorite': question.id in favorites,
         'url': question.url,
         'explanation': question.explanation,
         'discussion_link': question.discussion_link,
-        'user_selected_option': question.user_selected_option
-    } for question in questions]), 200
+        'user_selected_option': None
+    } for question, order in questions]), 200
 
 @app.route('/api/getQuizSetDetails/<string:quiz_set_id>', methods=['GET'])
+@conditional_on_quiz_set
 def get_quiz_set_details(quiz_set_id):
     quiz_set = QuizSet.query.get(quiz_set_id)
     if not quiz_set:
         return jsonify({'message': 'Quiz set not found'}), 404
 
-    questions = Question.query.filter_by(quiz_set_id=quiz_set_id).all()
-    answered_questions = [q for q in questions if q.user_selected_option is not None]
-    progress = len(answered_questions) / len(questions) * 100 if questions else 0
+    # Count in SQL so the stats cost one row no matter how large the set is
+    total_questions, answered_questions = with_taker_answers(db.session.query(
+        func.count(Question.id),
+        func.count(Answer.selected_option)
+    ), quiz_set_id, current_taker_id()).filter(Question.quiz_set_id == quiz_set_id).one()
+    progress = answered_questions / total_questions * 100 if total_questions else 0
+
+    # Each distinct URL once, in the order its first question appears
+    urls = db.session.query(Question.url).filter(Question.quiz_set_id == quiz_set_id) \
+        .group_by(Question.url).order_by(func.min(Question.order)).all()
 
     return jsonify({
         'id': quiz_set.id,
         'title': quiz_set.title,
-        'urls': [q.url for q in questions],
+        'urls': [url for url, in urls],
         'progress': round(progress),
-        'total_questions': len(questions),
-        'answered_questions': len(answered_questions)
+        'total_questions': total_questions,
+        'answered_questions': answered_questions
     })
 
 @app.route('/api/getQuizSetScore/<string:quiz_set_id>', methods=['GET'])
+@conditional_on_quiz_set
 def get_quiz_set_score(quiz_set_id):
     quiz_set = QuizSet.query.get(quiz_set_id)
     if not quiz_set:
         return jsonify({'message': 'Quiz set not found'}), 404
 
-    questions = Question.query.filter_by(quiz_set_id=quiz_set_id).all()
-    correct_answers_count = sum(1 for q in questions if q.user_selected_option == q.answer)
+    total_questions, correct_answers_count = with_taker_answers(db.session.query(
+        func.count(Question.id),
+        func.count(Question.id).filter(Answer.selected_option == Question.answer)
+    ), quiz_set_id, current_taker_id()).filter(Question.quiz_set_id == quiz_set_id).one()
 
     score = correct_answers_count  # or calculate the percentage if needed
-    total_questions = len(questions)
 
     return jsonify({"score": score, "total_questions": total_questions}), 200
 
@@ -393,20 +578,6 @@ def update_quiz_set_status(quiz_set_id):
 
     return jsonify({'message': 'Quiz set status updated successfully'}), 200
 
-def get_llm_response(prompt, providers):
-    for provider in providers:
-        try:
-            llm: LLM = G4FLLM(
-                model=models.gpt_35_turbo,
-                provider=provider,
-            )
-            res = llm(prompt)
-            return res
-        except Exception as e:
-            print(f"Error with provider {provider}: {e}")
-            continue
-    raise Exception("All providers failed")
-
 # Route to get further explanation based on POST request
 @app.route('/api/getFurtherExplanation', methods=['POST'])
 def post_further_explanation():
@@ -416,15 +587,11 @@ def post_further_explanation():
     options = data['options']
     answer = data['answer']
     explanation = data.get('explanation', '')
-
-    # Construct the prompt for the AI bot
-    if explanation and explanation != "Explanation not found.":
-        prompt = f"Given this explanation '{explanation}', explain further why {answer} is the answer to this following Question: {question_text} {' '.join(options)}. Explain it in the simplest and most appropriate way to understand, in Layman’s terms, why {answer} is the answer. Also, identify very brief keywords from the question_text that would serve as a memory guide or hint that would immediately kick in as to why we have the respective answer."
-    else:
-        prompt = f"Given this Question: {question_text} {' '.join(options)}, explain in the simplest and most appropriate way to understand, in Layman’s terms, why {answer} is the answer. Also, identify very brief keywords from the question_text that would serve as a memory guide or hint that would immediately kick in as to why we have the respective answer."
+    prompt = build_explanation_prompt(question_text, options, answer, explanation)
 
     try:
-        further_explanation = get_llm_response(prompt, providers_to_try)
+        # Served from the stored answers when this prompt was explained before
+        further_explanation = explanation_cache.explain(prompt)
         return jsonify({"further_explanation": further_explanation})
     except Exception as e:
         print(f"Error obtaining further explanation: {e}")
@@ -444,6 +611,22 @@ def save_further_explanation():
 
     return jsonify({"message": "Further explanation saved"}), 200
 
+@app.route('/api/pregenerateExplanations/<string:quiz_set_id>', methods=['POST'])
+def pregenerate_explanations(quiz_set_id):
+    if not QuizSet.query.get(quiz_set_id):
+        return jsonify({'message': 'Quiz set not found'}), 404
+
+    # Generation runs in the background; clients poll /api/explanationJobs/<job_id> for progress
+    job = start_explanation_job(quiz_set_id)
+    return jsonify({"message": "Explanation generation started.", "job_id": job.id}), 202
+
+@app.route('/api/explanationJobs/<string:job_id>', methods=['GET'])
+def get_explanation_job(job_id):
+    job = ExplanationJob.query.get(job_id)
+    if not job:
+        return jsonify({'message': 'Explanation job not found'}), 404
+    return jsonify(serialize_explanation_job(job)), 200
+
 # New GET route to retrieve further explanation
 @app.route('/api/getFurtherExplanation/<int:question_id>', methods=['GET'])
 def get_further_explanation(question_id):
@@ -489,11 +672,27 @@ def get_global_lock_state():
 def get_discussion_comments(question_id):
     question = Question.query.get(question_id)
     if question and question.discussion_link:
+        fetched_at = question.discussion_comments_fetched_at
+        if fetched_at and (datetime.utcnow() - fetched_at).total_seconds() < config.DISCUSSION_COMMENTS_TTL:
+            return jsonify({"discussion_comments": question.discussion_comments}), 200
+
         try:
-            comments = fetch_discussion_comments(question.discussion_link)
-            return jsonify({"discussion_comments": comments}), 200
+            comments, complete = fetch_discussion_comments(question.discussion_link)
+            error = None if complete else "Some discussion pages could not be fetched"
         except Exception as e:
-            return jsonify({"error": str(e)}), 500
+            db.session.rollback()
+            error = str(e)
+
+        if error:
+            # Only a complete fetch is stored, so the previous comments (even past their TTL) beat a partial or empty result
+            if fetched_at:
+                return jsonify({"discussion_comments": question.discussion_comments}), 200
+            return jsonify({"error": error}), 502
+
+        question.discussion_comments = comments
+        question.discussion_comments_fetched_at = datetime.utcnow()
+        db.session.commit()
+        return jsonify({"discussion_comments": comments}), 200
     return jsonify({"error": "Question or discussion link not found"}), 404
 
 @app.route('/api/downloadQuizPdf/<string:quiz_set_id>', methods=['GET'])
@@ -502,34 +701,6 @@ def download_quiz_pdf(quiz_set_id):
     if not quiz_set:
         return jsonify({'message': 'Quiz set not found'}), 404
 
-    questions = Question.query.filter_by(quiz_set_id=quiz_set_id).order_by(Question.order).all()
-    
-    buffer = io.BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    y_position = height - 30
-    p.drawString(30, y_position, f"Quiz: {quiz_set.title}")
-    y_position -= 20
-
-    for i, question in enumerate(questions, start=1):
-        y_position -= 15
-        p.drawString(30, y_position, f"Question No. {i}: {strip_tags(question.text)}")
-        y_position -= 15
-
-        for j, option in enumerate(question.options, start=1):
-            p.drawString(30, y_position, f"{chr(64+j)}. {strip_tags(option)}")  # Adjusted x-coordinate to 30
-            y_position -= 15
-
-        correct_answer = question.answer.replace("Option ", "")
-        p.drawString(30, y_position, f"Answer: {correct_answer}")  # Adjusted x-coordinate to 30
-        y_position -= 20
-
-        if y_position < 50:
-            p.showPage()
-            y_position = height - 30
-
-    p.save()
-    buffer.seek(0)
-
-    return send_file(buffer, as_attachment=True, download_name=f"{quiz_set.title}.pdf", mimetype='application/pdf')
\ No newline at end of file
+    # Rendered once per quiz set version; repeat downloads of an unchanged set are served from disk
+    path = pdf_cache.get(quiz_set)
+    return send_file(path, as_attachment=True, download_name=f"{quiz_set.title}.pdf", mimetype='application/pdf')
\ No newline at end of file
@@ -0,0 +1,175 @@
+# scrape_jobs.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import func
+from app_init import app, db
+from models import Question, ScrapeJob
+from scraping_helpers import process_question, process_indiabix_range, process_pinoybix_question, process_examveda_question, process_examprimer_question
+from quiz_set_versions import bump_quiz_set_version
+import config
+
+# Bounded pool that runs scrape jobs outside of the request workers
+scrape_executor = ThreadPoolExecutor(max_workers=config.SCRAPE_JOB_WORKERS, thread_name_prefix='scrape-job')
+
+# question.order is a 32-bit INTEGER
+MAX_ORDER = 2 ** 31 - 1
+
+class ScrapeProgress:
+    """Collects page, question and error counts for a scrape job and stores them on its ScrapeJob row."""
+
+    def __init__(self, job_id, skip_duplicates=False):
+        self.job_id = job_id
+        self.skip_duplicates = skip_duplicates  # Read by the job's QuestionWriters
+        self.pages_done = 0
+        self.questions_inserted = 0
+        self.questions_skipped = 0
+        self.insert_seconds = 0.0
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def page_done(self):
+        with self.lock:
+            self.pages_done += 1
+        self.save()
+
+    def rows_inserted(self, count, seconds, skipped=0):
+        with self.lock:
+            self.questions_inserted += count
+            self.questions_skipped += skipped
+            self.insert_seconds += seconds
+        self.save()
+
+    def error(self, message):
+        with self.lock:
+            self.errors.append(message)
+        self.save()
+
+    def save(self, **values):
+        with self.lock:
+            values.update(
+                pages_done=self.pages_done,
+                questions_inserted=self.questions_inserted,
+                questions_skipped=self.questions_skipped,
+                rows_per_second=round(self.questions_inserted / self.insert_seconds, 1) if self.insert_seconds else None,
+                errors=list(self.errors)
+            )
+        ScrapeJob.query.filter_by(id=self.job_id).update(values)
+        db.session.commit()
+
+def scrape_url_set(url_set, question_counter, quiz_set_id, progress):
+    # Dispatch a single URL set to the scraper for its site and return the next question counter
+    if isinstance(url_set, dict):
+        base_url = url_set.get('base_url', '')  # Extract the base URL
+
+        if 'indiabix' in base_url:
+            start_url = int(url_set.get('start_url', 1))
+            end_url = int(url_set.get('end_url', start_url))
+            question_counter = process_indiabix_range(base_url, start_url, end_url, question_counter, quiz_set_id, progress=progress)
+
+        elif 'pinoybix' in base_url:
+            question_counter = process_pinoybix_question(base_url, question_counter, quiz_set_id, db, Question, progress=progress)
+
+        elif 'examveda' in base_url:
+            start_page = int(url_set.get('start_page', 1))
+            end_page = int(url_set.get('end_page', 10))
+            question_counter = process_examveda_question(base_url, start_page, end_page, question_counter, quiz_set_id, db, Question, progress=progress)
+
+        elif 'web.archive.org' in base_url:
+            question_counter = process_examprimer_question(base_url, question_counter, quiz_set_id, db, Question, progress=progress)
+
+    elif isinstance(url_set, str):
+        if "pinoybix" in url_set:
+            question_counter = process_pinoybix_question(url_set, question_counter, quiz_set_id, db, Question, progress=progress)
+        elif "indiabix" in url_set:
+            question_counter = process_question(url_set, question_counter, quiz_set_id, progress=progress)
+        elif "examveda" in url_set:
+            question_counter = process_examveda_question(url_set, 1, 10, question_counter, quiz_set_id, db, Question, progress=progress)
+        elif "web.archive.org" in url_set:
+            question_counter = process_examprimer_question(url_set, question_counter, quiz_set_id, db, Question, progress=progress)
+
+    db.session.commit()  # After processing each URL set, commit the changes
+    return question_counter
+
+def order_block_size(set_count):
+    # question.order is a 32-bit INTEGER, so requests with many URL sets get smaller blocks
+    return min(config.ORDER_BLOCK_SIZE, MAX_ORDER // (set_count + 1))
+
+def scrape_url_set_in_block(url_set, block_index, block_size, quiz_set_id, progress):
+    # Scrape one URL set into its own reserved block of order values and return how many questions it added
+    with app.app_context():
+        first_question_counter = block_index * block_size + 1
+        try:
+            question_counter = scrape_url_set(url_set, first_question_counter, quiz_set_id, progress)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error occurred while scraping URL set {url_set}: {e}")
+            progress.error(f"Error scraping {url_set}: {e}")
+            # Skipped duplicates leave gaps, so the block ends after its highest stored order rather than after its row count
+            last_order = db.session.query(func.max(Question.order)).filter(
+                Question.quiz_set_id == quiz_set_id,
+                Question.order.between(first_question_counter, (block_index + 1) * block_size)
+            ).scalar()
+            question_counter = last_order + 1 if last_order is not None else first_question_counter
+        return question_counter - first_question_counter
+
+def compact_order_blocks(quiz_set_id, block_counts, block_size):
+    # Shift every block down so the order values run 1..N in the same sequence as the input URL sets
+    next_order = 1
+    for block_index, count in enumerate(block_counts):
+        block_start = block_index * block_size + 1
+        if count and block_start != next_order:
+            Question.query.filter(
+                Question.quiz_set_id == quiz_set_id,
+                Question.order.between(block_start, block_start + block_size - 1)
+            ).update({Question.order: Question.order - (block_start - next_order)}, synchronize_session=False)
+        next_order += count
+    bump_quiz_set_version(quiz_set_id)
+    db.session.commit()
+
+def run_scrape_job(job_id, quiz_set_id, urls, skip_duplicates=False):
+    with app.app_context():
+        progress = ScrapeProgress(job_id, skip_duplicates)
+        progress.save(status='running')
+
+        try:
+            # URL sets run concurrently, each writing into its own block of order values
+            block_size = order_block_size(len(urls))
+            with ThreadPoolExecutor(max_workers=max(1, min(config.SCRAPE_SET_CONCURRENCY, len(urls))), thread_name_prefix='scrape-set') as executor:
+                futures = [
+                    executor.submit(scrape_url_set_in_block, url_set, block_index, block_size, quiz_set_id, progress)
+                    for block_index, url_set in enumerate(urls)
+                ]
+                block_counts = [future.result() for future in futures]
+
+            compact_order_blocks(quiz_set_id, block_counts, block_size)
+            progress.save(status='completed', finished_at=datetime.utcnow())
+        except Exception as e:
+            db.session.rollback()
+            print(f"Scrape job {job_id} failed: {e}")
+            progress.errors.append(str(e))
+            progress.save(status='failed', finished_at=datetime.utcnow())
+
+def start_scrape_job(quiz_set_id, urls, skip_duplicates=False):
+    # Create the job row and hand the actual scraping to the background pool
+    job = ScrapeJob(quiz_set_id=quiz_set_id, skip_duplicates=skip_duplicates)
+    db.session.add(job)
+    db.session.commit()
+    scrape_executor.submit(run_scrape_job, job.id, quiz_set_id, urls, skip_duplicates)
+    return job
+
+def serialize_scrape_job(job):
+    return {
+        'id': job.id,
+        'quiz_set_id': job.quiz_set_id,
+        'status': job.status,
+        'pages_done': job.pages_done,
+        'questions_inserted': job.questions_inserted,
+        'skip_duplicates': job.skip_duplicates,
+        'questions_skipped': job.questions_skipped,
+        'rows_per_second': job.rows_per_second,
+        'errors': job.errors,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
@@ -0,0 +1,103 @@
+# scraper_http.py
+
+import threading
+import time
+from random import choice
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+import config
+
+# Number of sockets opened by the scraper pools; every other request reused a kept-alive connection
+connections_opened = 0
+connections_lock = threading.Lock()
+
+def record_new_connection():
+    global connections_opened
+    with connections_lock:
+        connections_opened += 1
+
+class CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        super().connect()
+        record_new_connection()
+
+class CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        super().connect()
+        record_new_connection()
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CountingHTTPConnection
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CountingHTTPSConnection
+
+class CountingHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool
+        }
+
+class ScraperHttpClient:
+    """Shared keep-alive HTTP client used by every scraper, with per-host connection pools and timeouts."""
+
+    def __init__(self, pool_connections, pool_maxsize, connect_timeout, read_timeout):
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = CountingHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.verify = False
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.failed_count = 0
+        self.request_time = 0.0
+
+    def get(self, url, headers=None, **kwargs):
+        request_headers = {'User-Agent': choice(config.headers_list)}
+        request_headers.update(headers or {})
+        kwargs.setdefault('timeout', self.timeout)
+
+        start = time.perf_counter()
+        failed = False
+        try:
+            return self.session.get(url, headers=request_headers, **kwargs)
+        except requests.RequestException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.request_count += 1
+                self.failed_count += failed
+                self.request_time += elapsed
+
+    def stats(self):
+        with self.lock:
+            request_count = self.request_count
+            failed_count = self.failed_count
+            request_time = self.request_time
+        with connections_lock:
+            opened = connections_opened
+
+        return {
+            'requests': request_count,
+            'failed_requests': failed_count,
+            'total_request_seconds': round(request_time, 3),
+            'average_request_ms': round(request_time / request_count * 1000, 1) if request_count else 0,
+            'host_pools': len(self.adapter.poolmanager.pools),
+            'connections_opened': opened,
+            'connections_reused': max(0, request_count - failed_count - opened)
+        }
+
+http_client = ScraperHttpClient(
+    pool_connections=config.HTTP_POOL_CONNECTIONS,
+    pool_maxsize=config.HTTP_POOL_MAXSIZE,
+    connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+    read_timeout=config.HTTP_READ_TIMEOUT
+)
@@ -1,22 +1,41 @@
 # scraping_helpers.py
 
 import requests
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 from urllib.parse import urljoin
 import os
 import re
-from random import choice
 import time
-from app_init import db
-from models import Question
+from concurrent.futures import ThreadPoolExecutor
 import config
 from config import img_type_directory
+from scraper_http import http_client
+from page_cache import page_cache
+from question_writer import QuestionWriter
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Helper function to match a class token while parsing (strainers see the raw, unsplit class attribute)
+def has_class(*class_names):
+    def matches(value):
+        if not value:
+            return False
+        classes = value.split() if isinstance(value, str) else value
+        return any(class_name in classes for class_name in class_names)
+    return matches
+
+# Parse-only filters so each site adapter builds just the subtrees it reads
+indiabix_questions_only = SoupStrainer('div', class_=has_class('bix-div-container'))
+examveda_questions_only = SoupStrainer('article', class_=has_class('question'))
+discussion_comments_only = SoupStrainer('div', class_=has_class('left-box', 'bix-sun-discussion'))
+
+# Helper function to parse scraped HTML with the configured parser, optionally restricted to the given subtrees
+def parse_html(content, parse_only=None):
+    return BeautifulSoup(content, config.HTML_PARSER, parse_only=parse_only)
+
 # Helper function to process image URLs (no image downloads, just ensure correct URLs)
 def process_image_url(img_url, base_url="https://www.indiabix.com"):
     # If the URL is relative (starts with '/'), prepend the base URL
@@ -25,60 +44,61 @@ def process_image_url(img_url, base_url="https://www.indiabix.com"):
     # Otherwise, return the full URL as is (NO quiz_set_id should be added)
     return img_url
 
-def fetch_discussion_comments(discussion_link):
+def fetch_discussion_page(page_url):
+    print(f"Fetching comments from URL: {page_url}")
+    response = http_client.get(page_url)
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Failed to fetch page: {page_url}", response=response)
+    return parse_html(response.content, discussion_comments_only)
+
+def parse_discussion_comments(soup):
     comments = []
+    comment_divs = soup.find_all('div', class_='bix-sun-discussion')
+    print(f"Found {len(comment_divs)} comment divs")
+
+    for div in comment_divs:
+        user_details = div.find('div', class_='user-details')
+        user_content = div.find('div', class_='user-content')
+        if user_details and user_content:
+            # Extract inner HTML content directly
+            comment_inner_html = ''.join(str(child) for child in user_content.contents)
+            comment_text = f"{user_details.get_text(strip=True)}: {comment_inner_html}"
+            comments.append(comment_text)
+            print(f"Extracted comment: {comment_text}")
+        else:
+            print("No user details or content found in this div")
+    return comments
+
+def fetch_discussion_comments(discussion_link, concurrency=None):
+    # Returns (comments, complete); complete is False when any page failed, so a partial result is never mistaken for the whole discussion
     # Split the URL at the last dash before "#comments"
     base_url = discussion_link.split("#")[0]
-    page_number = 1
 
-    while True:
-        if page_number == 1:
-            page_url = discussion_link  # Use original link for the first page
-        else:
-            # Correctly construct the URL for subsequent pages
-            page_url = f"{base_url}-{page_number}#comments"
-
-        print(f"Fetching comments from URL: {page_url}")
-
-        response = requests.get(page_url, headers={'User-Agent': choice(config.headers_list)}, verify=False)
-
-        if response.status_code != 200:
-            print(f"Failed to fetch page: {page_url}")
-            break
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Determine the total number of pages from the first page
-        if page_number == 1:
-            discussion_info = soup.find('div', class_='left-box').get_text(strip=True)
-            if "Page" in discussion_info:
-                total_pages = int(discussion_info.split('Page')[1].split('of')[1].split('.')[0].strip())
-            else:
-                total_pages = 1
-            print(f"Total number of discussion pages: {total_pages}")
-
-        comment_divs = soup.find_all('div', class_='bix-sun-discussion')
-        print(f"Found {len(comment_divs)} comment divs on page {page_number}")
-
-        for div in comment_divs:
-            user_details = div.find('div', class_='user-details')
-            user_content = div.find('div', class_='user-content')
-            if user_details and user_content:
-                # Extract inner HTML content directly
-                comment_inner_html = ''.join(str(child) for child in user_content.contents)
-                comment_text = f"{user_details.get_text(strip=True)}: {comment_inner_html}"
-                comments.append(comment_text)
-                print(f"Extracted comment: {comment_text}")
-            else:
-                print("No user details or content found in this div")
-
-        page_number += 1
-        if page_number > total_pages:
-            break
+    # The first page (original link) tells how many pages there are
+    try:
+        soup = fetch_discussion_page(discussion_link)
+    except requests.HTTPError as e:
+        print(e)
+        return '', False
+    discussion_info = soup.find('div', class_='left-box').get_text(strip=True)
+    if "Page" in discussion_info:
+        total_pages = int(discussion_info.split('Page')[1].split('of')[1].split('.')[0].strip())
+    else:
+        total_pages = 1
+    print(f"Total number of discussion pages: {total_pages}")
+    comments = parse_discussion_comments(soup)
+
+    # The remaining pages are fetched concurrently and assembled in page order, stopping at the first failed page
+    page_urls = [f"{base_url}-{page_number}#comments" for page_number in range(2, total_pages + 1)]
+    for page_url, page_soup, error in scrape_pages(page_urls, fetch_discussion_page, concurrency):
+        if error:
+            print(error)
+            return '\n'.join(comments), False
+        comments.extend(parse_discussion_comments(page_soup))
 
     if not comments:
         print("No comments were extracted")
-    return '\n'.join(comments)
+    return '\n'.join(comments), True
 
 def process_question_with_square_root(html_content):
     # Handle the square root format by replacing <span class='root'><span class='symbol'>X</span></span> with √(X)
@@ -87,30 +107,41 @@ def process_question_with_square_root(html_content):
 
     return processed_content
 
-# Helper function to process questions
-def process_question(base_url, url_number, question_counter, quiz_set_id):
-    if not base_url.startswith('https://'):
-        base_url = 'https://' + base_url
-    url = base_url + str(url_number).zfill(6)  # Format the URL number to ensure it's padded with zeros if necessary
-    MAX_RETRIES = 10
-    backoff_time = 3  # Time to wait before retrying in case of failure
-
-    # Retry mechanism for robust scraping
-    for attempt in range(MAX_RETRIES):
+# Helper function to fetch a page with the linear-backoff retry used by all scrapers
+def fetch_page(url, max_retries=10, backoff_time=3):
+    for attempt in range(max_retries):
         try:
             time.sleep(backoff_time * attempt)
-            page = requests.get(url, headers={'User-Agent': choice(config.headers_list)}, verify=False)
-            page.raise_for_status()
-            break
+            return page_cache.fetch(url)
         except requests.RequestException as request_exception:
             print(f'Error occurred for {url}, waiting for {backoff_time * attempt} seconds before retrying...')
-            if attempt == MAX_RETRIES - 1:
-                print(f"Failed to fetch {url} after {MAX_RETRIES} attempts. Error: {request_exception}")
-                return question_counter
-            continue
+            if attempt == max_retries - 1:
+                print(f"Failed to fetch {url} after {max_retries} attempts. Error: {request_exception}")
+                raise
+
+# Helper function to scrape several pages at once while yielding results in page order
+def scrape_pages(urls, scrape_page, concurrency=None):
+    def scrape(url):
+        try:
+            return url, scrape_page(url), None
+        except Exception as e:
+            return url, None, e
 
-    soup = BeautifulSoup(page.content, 'html.parser')
+    concurrency = concurrency or config.SCRAPE_PAGE_CONCURRENCY
+    if concurrency <= 1 or len(urls) <= 1:
+        for url in urls:
+            yield scrape(url)
+        return
+
+    # map() keeps results in submission order, so question order matches the sequential scrape
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(urls)), thread_name_prefix='scrape-page') as executor:
+        yield from executor.map(scrape, urls)
+
+# Helper function to extract the questions from an IndiaBix page
+def parse_indiabix_page(content):
+    soup = parse_html(content, indiabix_questions_only)
     questions = soup.find_all('div', class_='bix-div-container')
+    parsed_questions = []
 
     for question in questions:
         try:
@@ -163,56 +194,73 @@ def process_question(base_url, url_number, question_counter, quiz_set_id):
             if discussion_link_elem:
                 discussion_link = discussion_link_elem['href']
 
-            # Ensure `quiz_set_id` is properly passed when creating the question
-            if quiz_set_id is None:
-                raise ValueError(f"`quiz_set_id` is missing for question {question_counter}")
-
-            # Log the processed question details
-            print(f"Processed Question {question_counter}:")
-            print(f"Text: {question_text}")
-            print(f"Options: \n{options_processed}")
-            print(f"Answer: {answer}")
-            print(f"Explanation: {explanation}")
-            print(f"Discussion Link: {discussion_link}")
-            print("----------------------------------------------------")
-
-            # Create the new question and add it to the session
-            new_question = Question(
-                text=question_text,
-                options=options_processed,
-                answer=answer,
-                url=url,
-                explanation=explanation,
-                discussion_link=discussion_link,
-                quiz_set_id=quiz_set_id,  # Ensure this is passed correctly
-                order=question_counter
-            )
-            db.session.add(new_question)
-            question_counter += 1
+            parsed_questions.append({
+                'text': question_text,
+                'options': options_processed,
+                'answer': answer,
+                'explanation': explanation,
+                'discussion_link': discussion_link
+            })
 
         except Exception as e:
             print(f"Error occurred while processing question: {e}")
 
-    db.session.commit()
+    return parsed_questions
+
+# Helper function to build the URL of a numbered IndiaBix page
+def indiabix_url(base_url, url_number):
+    if not base_url.startswith('https://'):
+        base_url = 'https://' + base_url
+    return base_url + str(url_number).zfill(6)  # Format the URL number to ensure it's padded with zeros if necessary
+
+def scrape_indiabix_page(url):
+    return parse_indiabix_page(fetch_page(url))
+
+# Helper function to process questions
+def process_question(base_url, url_number, question_counter, quiz_set_id, progress=None):
+    return process_indiabix_range(base_url, url_number, url_number, question_counter, quiz_set_id, progress=progress, concurrency=1)
+
+# Function to process a range of IndiaBix pages, fetching and parsing up to `concurrency` pages at once
+def process_indiabix_range(base_url, start_url, end_url, question_counter, quiz_set_id, progress=None, concurrency=None):
+    urls = [indiabix_url(base_url, url_number) for url_number in range(int(start_url), int(end_url) + 1)]
+
+    with QuestionWriter(quiz_set_id, progress=progress) as writer:
+        for url, parsed_questions, error in scrape_pages(urls, scrape_indiabix_page, concurrency):
+            if error:
+                print(f"Error occurred while scraping {url}: {error}")
+                if progress:
+                    progress.error(f"Failed to fetch {url}: {error}")
+                continue
+
+            for parsed in parsed_questions:
+                writer.add(order=question_counter, url=url, **parsed)
+                question_counter += 1
+
+            print(f"Processed {len(parsed_questions)} questions from {url}")
+            if progress:
+                progress.page_done()
+
     return question_counter
 
 # Function to process PinoyBix questions
-def process_pinoybix_question(url, question_counter, quiz_set_id, db, Question):
+def process_pinoybix_question(url, question_counter, quiz_set_id, db, Question, progress=None):
     # Ensure the URL starts with https://
     if not url.startswith('https://'):
         url = 'https://' + url
 
     MAX_RETRIES = 10
     backoff_time = 3
+    first_question_counter = question_counter
+    writer = QuestionWriter(quiz_set_id, progress=progress)
 
     for attempt in range(MAX_RETRIES):
         try:
             time.sleep(backoff_time * attempt)
-            # Send the HTTP request to get the content of the Pinoybix page
-            response = requests.get(url, headers={'User-Agent': choice(config.headers_list)}, verify=False)
-            response.raise_for_status()
+            # Send the HTTP request (or read the page cache) to get the content of the Pinoybix page
+            content = page_cache.fetch(url)
 
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # The question, choice and answer paragraphs are siblings, so PinoyBix needs the whole page
+            soup = parse_html(content)
 
             # Iterate over all paragraphs and look for the question pattern
             paragraphs = soup.find_all('p')
@@ -228,8 +276,6 @@ def process_pinoybix_question(url, question_counter, quiz_set_id, db, Question):
                     question_html = str(p)
                     question_html = re.sub(r'^<p>\d+\.', '<p>', question_html)  # Remove question number from HTML
 
-                    soup_question = BeautifulSoup(question_html, 'html.parser')
-
                     # Handle image URLs directly (no downloading needed)
                     img_tag = p.find('img')
                     if not img_tag:
@@ -271,146 +317,131 @@ def process_pinoybix_question(url, question_counter, quiz_set_id, db, Question):
                         if answer_match:
                             key_answer = 'Option ' + answer_match.group(1)
 
-                    # Log the processed question details for debugging
-                    print(f"Processed Question {question_counter}:")
-                    print(f"Text: {question_text}")
-                    print(f"Options: {choices}")
-                    print(f"Answer: {key_answer}")
-                    print("----------------------------------------------------")
-
-                    # Create a new question entry and add it to the database
-                    new_question = Question(
+                    # Queue the new question entry for the database
+                    writer.add(
+                        order=question_counter,  # Set the order field
                         text=question_text,
                         options=choices,
                         answer=key_answer,
-                        quiz_set_id=quiz_set_id,
                         url=url,
                         explanation="No explanation available.",
-                        discussion_link="No discussion link available",
-                        order=question_counter  # Set the order field
+                        discussion_link="No discussion link available"
                     )
-                    db.session.add(new_question)
                     question_counter += 1  # Increment the global counter here
 
-            # Commit the changes to the database
-            db.session.commit()
+            # Write the remaining questions to the database
+            writer.close()
+            print(f"Processed {question_counter - first_question_counter} questions from {url}")
+            if progress:
+                progress.page_done()
             return question_counter  # Return the updated question_counter
 
         except requests.RequestException as request_exception:
             print(f'Error occurred for {url}, waiting for {backoff_time * attempt} secs before retrying...')
             if attempt == MAX_RETRIES - 1:
                 print(f"Error fetching {url} after {MAX_RETRIES} attempts, Error: {request_exception}")
+                if progress:
+                    progress.error(f"Failed to fetch {url}: {request_exception}")
                 return question_counter  # Return the current question_counter even on failure
             continue
         except Exception as err:
             print(f'An error occurred: {err}')
+            if progress:
+                progress.error(f"Error processing {url}: {err}")
+            writer.close()  # Keep the questions already parsed so the counter stays in step with the stored rows
             return question_counter  # Return the current question_counter in case of any other errors
 
-# Function to process Examveda questions
-def process_examveda_question(base_url, start_page, end_page, question_counter, quiz_set_id, db, Question):
+# Helper function to extract the questions from an Examveda page
+def parse_examveda_page(url, content):
+    soup = parse_html(content, examveda_questions_only)
+    questions = soup.find_all('article', class_='question')
+    parsed_questions = []
+
+    # Ensure that questions are processed in the same order they appear on the page
+    for question in questions:
+        q_text_elem = question.find('div', class_='question-main')
+        if not q_text_elem:
+            continue
+
+        # Extract the question text
+        question_html = str(q_text_elem)
+        question_html = re.sub(r'\$\s+', r'$ ', question_html)  # Handle special characters
+        question_html = re.sub(r'\$\$(.*?)\$\$', r'<span class="mathjax">\1</span>', question_html)
+
+        # Process images directly from the source, no local downloads or placeholders
+        img_elems = q_text_elem.find_all('img')
+
+        # Replace relative image paths with full URLs
+        for img_elem in img_elems:
+            img_url = img_elem['src']
+            if img_url.startswith('/'):
+                img_url = urljoin(url, img_url)
+            # Replace the img tag's source with the correct URL (only if relative)
+            img_elem['src'] = img_url
+
+        # Reconvert the modified HTML
+        question_html = str(q_text_elem)  # This ensures images aren't duplicated
+
+        # Extract options and explanation
+        options_html = []
+        option_blocks = question.find_all('p')
+        for block in option_blocks:
+            labels = block.find_all('label')
+            if len(labels) > 1:
+                option_html = str(labels[1])
+                options_html.append(option_html)
+
+        # Extract the correct answer
+        answer_elem = question.find('strong')
+        answer = answer_elem.text.strip() if answer_elem else 'Answer not found.'
+        explanation_elem = answer_elem.find_next_sibling('div') if answer_elem else None
+        explanation = explanation_elem.get_text(strip=True) if explanation_elem else 'No explanation available.'
+
+        # Extract the discussion link
+        discussion_link_elem = question.find('a', text='Discuss in Board')
+        discussion_link = discussion_link_elem['href'] if discussion_link_elem else 'Discussion link not found.'
+
+        parsed_questions.append({
+            'text': question_html,
+            'options': options_html,
+            'answer': answer,
+            'explanation': explanation,
+            'discussion_link': discussion_link
+        })
+
+    return parsed_questions
+
+def scrape_examveda_page(url):
+    return parse_examveda_page(url, fetch_page(url))
+
+# Function to process Examveda questions, fetching and parsing up to `concurrency` pages at once
+def process_examveda_question(base_url, start_page, end_page, question_counter, quiz_set_id, db, Question, progress=None, concurrency=None):
     if not base_url.startswith('https://'):
         base_url = 'https://' + base_url
 
-    MAX_RETRIES = 10
-    backoff_time = 3
-
     # Process each page in the specified range (start_page to end_page)
-    for page_num in range(int(start_page), int(end_page) + 1):
-        url = f"{base_url}?page={page_num}"  # Adjust URL to include the page number
-
-        for attempt in range(MAX_RETRIES):
-            try:
-                time.sleep(backoff_time * attempt)
-                response = requests.get(url, headers={'User-Agent': choice(config.headers_list)}, verify=False)
-                response.raise_for_status()
-
-                soup = BeautifulSoup(response.content, 'html.parser')
-                questions = soup.find_all('article', class_='question')
-
-                # Ensure that questions are processed in the same order they appear on the page
-                for question in questions:
-                    q_text_elem = question.find('div', class_='question-main')
-                    if not q_text_elem:
-                        continue
-
-                    # Extract the question text
-                    question_html = str(q_text_elem)
-                    question_html = re.sub(r'\$\s+', r'$ ', question_html)  # Handle special characters
-                    question_html = re.sub(r'\$\$(.*?)\$\$', r'<span class="mathjax">\1</span>', question_html)
-
-                    # Process images directly from the source, no local downloads or placeholders
-                    img_elems = q_text_elem.find_all('img')
-
-                    # Replace relative image paths with full URLs
-                    for img_elem in img_elems:
-                        img_url = img_elem['src']
-                        if img_url.startswith('/'):
-                            img_url = urljoin(url, img_url)
-                        # Replace the img tag's source with the correct URL (only if relative)
-                        img_elem['src'] = img_url
-
-                    # Reconvert the modified HTML
-                    question_html = str(q_text_elem)  # This ensures images aren't duplicated
-
-                    # Extract options and explanation
-                    options_html = []
-                    option_blocks = question.find_all('p')
-                    for block in option_blocks:
-                        labels = block.find_all('label')
-                        if len(labels) > 1:
-                            option_html = str(labels[1])
-                            options_html.append(option_html)
-
-                    # Extract the correct answer
-                    answer_elem = question.find('strong')
-                    answer = answer_elem.text.strip() if answer_elem else 'Answer not found.'
-                    explanation_elem = answer_elem.find_next_sibling('div') if answer_elem else None
-                    explanation = explanation_elem.get_text(strip=True) if explanation_elem else 'No explanation available.'
-
-                    # Extract the discussion link
-                    discussion_link_elem = question.find('a', text='Discuss in Board')
-                    discussion_link = discussion_link_elem['href'] if discussion_link_elem else 'Discussion link not found.'
-
-                    # Log processed question details
-                    print(f"Processed Question {question_counter}:")
-                    print(f"Text: {question_html}")
-                    print(f"Options: \n{options_html}")
-                    print(f"Answer: {answer}")
-                    print(f"URL: {url}")
-                    print(f"Explanation: {explanation}")
-                    print(f"Discussion Link: {discussion_link}")
-                    print("----------------------------------------------------")
-
-                    # Store question in the database
-                    new_question = Question(
-                        text=question_html,
-                        options=options_html,
-                        answer=answer,
-                        explanation=explanation,
-                        url=url,
-                        discussion_link=discussion_link,
-                        quiz_set_id=quiz_set_id,
-                        order=question_counter  # Set the order field
-                    )
-                    db.session.add(new_question)
-
-                    question_counter += 1  # Ensure the question counter increments sequentially
+    urls = [f"{base_url}?page={page_num}" for page_num in range(int(start_page), int(end_page) + 1)]
+
+    with QuestionWriter(quiz_set_id, progress=progress) as writer:
+        for url, parsed_questions, error in scrape_pages(urls, scrape_examveda_page, concurrency):
+            if error:
+                print(f"Error occurred while scraping {url}: {error}")
+                if progress:
+                    progress.error(f"Failed to scrape {url}: {error}")
+                continue
 
-                db.session.commit()  # Commit after processing each page
-                break  # Break retry loop if successful
+            # Queue each question for the batched insert
+            for parsed in parsed_questions:
+                writer.add(order=question_counter, url=url, **parsed)
+                question_counter += 1  # Ensure the question counter increments sequentially
 
-            except requests.RequestException as request_exception:
-                print(f'Error occurred for {url}, waiting for {backoff_time * attempt} secs before retrying...')
-                if attempt == MAX_RETRIES - 1:
-                    print(f"Error fetching {url} after {MAX_RETRIES} attempts, Error: {request_exception}")
-                continue
-            except Exception as e:
-                print(f"Error occurred while processing page {page_num}: {e}")
-                break
+            print(f"Processed {len(parsed_questions)} questions from {url}")
+            if progress:
+                progress.page_done()
 
     return question_counter  # Return the updated question counter
 
-def process_examprimer_question(url, question_counter, quiz_set_id, db, Question):
+def process_examprimer_question(url, question_counter, quiz_set_id, db, Question, progress=None):
     if not url.startswith('https://'):
         url = 'https://' + url
 
@@ -435,6 +466,8 @@ def process_examprimer_question(url, question_counter, quiz_set_id, db, Question
             WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "question")))
             questions = driver.find_elements(By.CLASS_NAME, "question")
 
+            # Parse the whole page first, so a failed attempt queues nothing that the retry would queue again
+            parsed_questions = []
             for question in questions:
                 full_text = question.text.strip()
                 lines = full_text.split('\n')
@@ -450,41 +483,38 @@ def process_examprimer_question(url, question_counter, quiz_set_id, db, Question
                         break
 
                 correct_option = 'Option ' + chr(correct_answer_index + 65) if correct_answer_index is not None else "No correct answer found"
+                parsed_questions.append({'text': question_text, 'options': options, 'answer': correct_option})
 
-                # Print details instead of writing to a file
-                print(f"Processed Question {question_counter}:")
-                print(f"Text: {question_text}")
-                print("Options: \n{}".format('\n'.join(options)))
-                print(f"Answer: {correct_option}")
-                print(f"URL: {url}")
-                print("Explanation: No explanation available.")
-                print("Discussion Link: Discussion link not found.")
-                print("----------------------------------------------------")
-
-                # Create a new Question object and add it to the session
-                new_question = Question(
-                    text=question_text,
-                    options=options,
-                    answer=correct_option,
-                    explanation="No explanation available.",
-                    url=url,
-                    discussion_link="Discussion link not found.",
-                    quiz_set_id=quiz_set_id
-                )
-                db.session.add(new_question)
-                question_counter += 1
+            # Queue the questions for the batched insert, like the other scrapers
+            with QuestionWriter(quiz_set_id, progress=progress) as writer:
+                for parsed in parsed_questions:
+                    writer.add(
+                        order=question_counter,
+                        url=url,
+                        explanation="No explanation available.",
+                        discussion_link="Discussion link not found.",
+                        **parsed
+                    )
+                    question_counter += 1
+
+            print(f"Processed {len(parsed_questions)} questions from {url}")
+            if progress:
+                progress.page_done()
+            return question_counter
 
         except requests.RequestException as request_exception:
             print(f'Error occurred for {url}, waiting for {backoff_time * attempt} secs before retrying.....')
             if attempt == MAX_RETRIES - 1:
                 print(f"Error fetching {url} after {MAX_RETRIES} attempts, Error: {request_exception}")
+                if progress:
+                    progress.error(f"Failed to fetch {url}: {request_exception}")
         except Exception as e:
             print(f'An unexpected error occurred: {e}')
+            if progress:
+                progress.error(f"Error processing {url}: {e}")
         finally:
             if driver:
                 driver.quit()  # Quit the driver if it's initialized
+                driver = None
 
-        if attempt == MAX_RETRIES - 1:
-            return question_counter  # Return from the function if all retries fail
-
-    return question_counter
\ No newline at end of file
+    return question_counter
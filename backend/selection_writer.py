@@ -0,0 +1,143 @@
+# selection_writer.py
+
+import atexit
+import os
+import threading
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.postgresql import insert
+from app_init import app, db
+from models import Question, Answer
+from attempts import ensure_attempts, bump_attempt_versions
+import config
+
+class InvalidSelection(ValueError):
+    """Raised for an answer that could never be stored, so it is rejected before it is queued."""
+
+# question.id is a 32-bit INTEGER
+MAX_QUESTION_ID = 2 ** 31 - 1
+
+# Longest selected_option the answer table accepts
+MAX_SELECTED_OPTION_LENGTH = Answer.__table__.c.selected_option.type.length
+
+def validate_selection(question_id, selected_option):
+    # Returns (question_id, selected_option) ready to store; the id may arrive as a numeric string
+    if isinstance(question_id, bool) or not isinstance(question_id, (int, str)) or not str(question_id).isdecimal() \
+            or int(question_id) > MAX_QUESTION_ID:
+        raise InvalidSelection(f"question_id must be a positive integer, got {question_id!r}")
+    if selected_option is not None and (not isinstance(selected_option, str) or len(selected_option) > MAX_SELECTED_OPTION_LENGTH):
+        raise InvalidSelection(f"selected_option must be null or a string of at most {MAX_SELECTED_OPTION_LENGTH} characters")
+    return int(question_id), selected_option
+
+def write_selections(taker_id, selections):
+    """Upsert many {question_id: selected_option} answers of one taker with one INSERT and one commit. Returns the number of answers stored.
+
+    Question ids may be ints or numeric strings (JSON object keys); anything else raises InvalidSelection.
+    """
+    selections = dict(validate_selection(question_id, option) for question_id, option in selections.items())
+    if not selections:
+        return 0
+
+    quiz_set_of = dict(db.session.execute(
+        select(Question.id, Question.quiz_set_id).where(Question.id.in_(list(selections)))
+    ).all())
+    if not quiz_set_of:
+        return 0
+    attempt_of = ensure_attempts(taker_id, quiz_set_of.values())
+
+    rows = [{
+        'attempt_id': attempt_of[quiz_set_id],
+        'question_id': question_id,
+        'selected_option': selections[question_id]
+    } for question_id, quiz_set_id in quiz_set_of.items()]
+    statement = insert(Answer).values(rows)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[Answer.attempt_id, Answer.question_id],
+        set_={'selected_option': statement.excluded.selected_option}
+    ))
+    bump_attempt_versions(taker_id, quiz_set_of.values())
+    db.session.commit()
+    return len(rows)
+
+class SelectionBuffer:
+    """Write-behind buffer for answer clicks.
+
+    Repeated answers of a taker to the same question are coalesced, and the latest ones are written with
+    write_selections() every `interval` seconds, as soon as `max_pending` questions are waiting,
+    and once more when the process exits cleanly.
+    """
+
+    def __init__(self, interval, max_pending):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = {}  # (taker_id, question_id) -> selected_option
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.flusher_pid = None
+
+    def add(self, taker_id, selections):
+        # Normalized here so '5' and 5 coalesce, and an unstorable answer is rejected before it is queued
+        selections = dict(validate_selection(question_id, option) for question_id, option in selections.items())
+        self.ensure_flusher()
+        with self.lock:
+            self.pending.update({(taker_id, question_id): option for question_id, option in selections.items()})
+            if len(self.pending) >= self.max_pending:
+                self.wake.set()
+
+    def ensure_flusher(self):
+        # Started lazily so every forked worker gets its own flusher thread
+        if self.flusher_pid == os.getpid():
+            return
+        with self.lock:
+            if self.flusher_pid == os.getpid():
+                return
+            self.flusher_pid = os.getpid()
+        threading.Thread(target=self.run, name='selection-flusher', daemon=True).start()
+
+    def run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                selections, self.pending = self.pending, {}
+            if not selections:
+                return
+            by_taker = {}
+            for (taker_id, question_id), option in selections.items():
+                by_taker.setdefault(taker_id, {})[question_id] = option
+            retry = {}
+            with app.app_context():
+                for taker_id, taker_selections in by_taker.items():
+                    try:
+                        write_selections(taker_id, taker_selections)
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Error writing {len(taker_selections)} buffered selections of {taker_id}, retrying one by one: {e}")
+                        retry.update(self.write_one_by_one(taker_id, taker_selections))
+            if retry:
+                with self.lock:
+                    # Answers that arrived meanwhile are newer and win over the failed ones
+                    self.pending = {**retry, **self.pending}
+
+    def write_one_by_one(self, taker_id, selections):
+        # A row the database rejects is dropped so it cannot block the rest; only lost connections are retried later
+        retry = {}
+        for question_id, option in selections.items():
+            try:
+                write_selections(taker_id, {question_id: option})
+            except OperationalError as e:
+                db.session.rollback()
+                print(f"Database unavailable, will retry the selection of {taker_id} for question {question_id}: {e}")
+                retry[(taker_id, question_id)] = option
+            except Exception as e:
+                db.session.rollback()
+                print(f"Dropping the selection of {taker_id} for question {question_id}: {e}")
+        return retry
+
+selection_buffer = SelectionBuffer(interval=config.SELECTION_FLUSH_INTERVAL, max_pending=config.SELECTION_FLUSH_SIZE)
+atexit.register(selection_buffer.flush)
@@ -0,0 +1,18 @@
+# conftest.py
+
+import os
+import sys
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def app():
+    """The Flask app bound to TEST_DATABASE_URL, with its tables created; tests that need it skip without one."""
+    database_url = os.getenv('TEST_DATABASE_URL')
+    if not database_url:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    os.environ['DATABASE_URL'] = database_url
+    from app_init import app
+    return app
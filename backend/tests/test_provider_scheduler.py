@@ -0,0 +1,122 @@
+# test_provider_scheduler.py
+
+import threading
+import time
+import pytest
+from provider_scheduler import ProviderScheduler
+
+class StubProviders:
+    """Stand-in for the LLM providers: each name answers after a delay, fails, or hangs until its timeout."""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def call(self, provider, prompt, timeout):
+        with self.lock:
+            self.calls.append(provider)
+        behaviour = self.behaviours[provider]
+        if behaviour == 'fail':
+            raise RuntimeError(f"{provider} failed")
+        if behaviour == 'hang':
+            threading.Event().wait(timeout)
+            raise TimeoutError(f"{provider} timed out")
+        time.sleep(behaviour)
+        return f"{provider}: {prompt}"
+
+def scheduler_for(stubs, **overrides):
+    options = dict(hedge_delay=0.05, request_timeout=1.0, max_parallel=3, failure_threshold=2, cooldown=0.3, workers=4)
+    options.update(overrides)
+    return ProviderScheduler(list(stubs.behaviours), stubs.call, **options)
+
+def health_of(scheduler, provider):
+    return next(stats for stats in scheduler.stats() if stats['provider'] == provider)
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+def test_slow_provider_is_hedged_by_the_next_one():
+    stubs = StubProviders({'slow': 0.5, 'fast': 0.0})
+    scheduler = scheduler_for(stubs)
+
+    started = time.monotonic()
+    assert scheduler.complete('q') == 'fast: q'
+    assert time.monotonic() - started < 0.4
+    assert stubs.calls == ['slow', 'fast']
+
+def test_failure_starts_the_next_provider_at_once():
+    stubs = StubProviders({'broken': 'fail', 'working': 0.0})
+    scheduler = scheduler_for(stubs, hedge_delay=5.0)
+
+    started = time.monotonic()
+    assert scheduler.complete('q') == 'working: q'
+    assert time.monotonic() - started < 1.0
+    wait_until(lambda: health_of(scheduler, 'broken')['failures'] == 1)
+    assert health_of(scheduler, 'working')['successes'] == 1
+
+def test_healthier_provider_is_asked_first():
+    stubs = StubProviders({'broken': 'fail', 'working': 0.0})
+    scheduler = scheduler_for(stubs, failure_threshold=10)
+    scheduler.complete('q')
+    wait_until(lambda: health_of(scheduler, 'broken')['failures'] == 1)
+
+    stubs.calls.clear()
+    scheduler.complete('q')
+    assert stubs.calls == ['working']
+
+def test_circuit_opens_and_half_opens_after_the_cooldown():
+    stubs = StubProviders({'flaky': 'fail', 'backup': 0.2})
+    scheduler = scheduler_for(stubs)
+    for _ in range(2):
+        scheduler.start('flaky', 'q', 1.0).exception()
+    wait_until(lambda: health_of(scheduler, 'flaky')['circuit_open'])
+
+    # A slow answer would normally bring in a hedge, but an open circuit is skipped
+    stubs.calls.clear()
+    assert scheduler.complete('q') == 'backup: q'
+    assert stubs.calls == ['backup']
+
+    # After the cooldown the provider is tried again, and a success closes its circuit
+    time.sleep(0.35)
+    stubs.behaviours.update({'flaky': 0.0, 'backup': 'fail'})
+    assert scheduler.complete('q') == 'flaky: q'
+    wait_until(lambda: health_of(scheduler, 'flaky')['successes'] == 1)
+    assert not health_of(scheduler, 'flaky')['circuit_open']
+
+def test_half_open_probe_keeps_the_circuit_open_for_other_requests():
+    stubs = StubProviders({'flaky': 'fail', 'backup': 0.0})
+    scheduler = scheduler_for(stubs, max_parallel=1)
+    for _ in range(2):
+        scheduler.start('flaky', 'q', 1.0).exception()
+    wait_until(lambda: health_of(scheduler, 'flaky')['circuit_open'])
+    time.sleep(0.35)
+
+    stubs.behaviours['flaky'] = 0.3
+    probe = scheduler.start('flaky', 'q', 1.0)
+    assert scheduler.ranked() == ['backup']
+    assert probe.result() == 'flaky: q'
+
+def test_hung_provider_is_counted_as_failed_at_the_deadline():
+    stubs = StubProviders({'hung': 'hang'})
+    scheduler = scheduler_for(stubs, request_timeout=0.2)
+
+    started = time.monotonic()
+    with pytest.raises(Exception, match='All providers failed'):
+        scheduler.complete('q')
+    assert time.monotonic() - started < 0.5
+    wait_until(lambda: health_of(scheduler, 'hung')['failures'] == 1)
+    # The call's own timeout ends it, and its late error is not counted a second time
+    time.sleep(0.1)
+    assert health_of(scheduler, 'hung')['failures'] == 1
+
+def test_hedge_still_running_after_an_answer_is_counted_as_failed():
+    stubs = StubProviders({'hung': 'hang', 'fast': 0.0})
+    scheduler = scheduler_for(stubs, request_timeout=0.3)
+
+    assert scheduler.complete('q') == 'fast: q'
+    wait_until(lambda: health_of(scheduler, 'hung')['failures'] == 1)
+    assert scheduler.ranked()[0] == 'fast'
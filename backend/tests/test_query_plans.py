@@ -0,0 +1,15 @@
+# test_query_plans.py
+
+def test_hot_queries_use_their_indexes(app):
+    # Imported here because importing the app connects to the database the fixture configured
+    from commands import hot_queries, query_plan
+    from db import db
+
+    failures = []
+    with app.app_context():
+        for description, query, index_name in hot_queries():
+            plan = query_plan(query)
+            if index_name not in plan:
+                failures.append(f"{description} does not use {index_name}:\n{plan}")
+        db.session.rollback()
+    assert not failures, '\n\n'.join(failures)
@@ -45,11 +45,11 @@ import {
 } from '@radix-ui/react-icons';
 import UrlsModal from '../components/UrlsModal';
 import { getBackendUrl } from '@/utils/getBackendUrl';
+import { takerHeaders } from '@/utils/takerId';
 
 interface QuizSet {
   id: string;
   title: string;
-  urls: string[];
   progress: number;
   score: number;
   total_questions: number;
@@ -58,6 +58,17 @@ interface QuizSet {
   lockState: boolean;
 }
 
+interface QuizSetSummary {
+  id: string;
+  title: string;
+  total_questions: number;
+  answered_questions: number;
+  correct_answers: number;
+  progress: number;
+  lock_state: boolean;
+  eye_icon_state: boolean;
+}
+
 interface UrlGroups {
   [baseUrl: string]: {
     [prefix: string]: {
@@ -85,38 +96,31 @@ const DynamicQuizTable = () => {
   // Determine if we're on a mobile device
   const isMobile = useBreakpointValue({ base: true, md: false });
 
-  // Fetch quiz sets data
+  // Fetch quiz sets data, one page of summaries at a time
   const fetchQuizSets = async () => {
     try {
-      const response = await fetch(`${backendUrl}/getQuizSets`);
-      if (!response.ok) throw new Error('Network response was not ok');
+      const pageSize = 200;
+      const summaries: QuizSetSummary[] = [];
+      for (let offset = 0; ; offset += pageSize) {
+        const response = await fetch(`${backendUrl}/getQuizSetSummaries?limit=${pageSize}&offset=${offset}`, { headers: takerHeaders() });
+        if (!response.ok) throw new Error('Network response was not ok');
+        const page: QuizSetSummary[] = await response.json();
+        summaries.push(...page);
+        if (page.length < pageSize) break;
+      }
 
-      const quizSetsData = await response.json();
-      const updatedQuizSets = await Promise.all(
-        quizSetsData.map(async (quizSet: QuizSet) => {
-          const detailsResponse = await fetch(`${backendUrl}/getQuizSetDetails/${quizSet.id}`);
-          const details = await detailsResponse.json();
-
-          const scoreResponse = await fetch(`${backendUrl}/getQuizSetScore/${quizSet.id}`);
-          const scoreData = await scoreResponse.json();
-
-          // Fetch lock state
-          const lockStateResponse = await fetch(`${backendUrl}/getLockState/${quizSet.id}`);
-          const lockStateData = await lockStateResponse.json();
-
-          return {
-            ...quizSet,
-            urls: details.urls,
-            progress: details.progress,
-            score: scoreData.score,
-            total_questions: scoreData.total_questions,
-            grade: calculateGrade(scoreData.score, scoreData.total_questions),
-            status: calculateStatus(scoreData.score, scoreData.total_questions),
-            lockState: lockStateData.lock_state, // Set lock state
-          };
-        })
+      setQuizSets(
+        summaries.map((summary) => ({
+          id: summary.id,
+          title: summary.title,
+          progress: summary.progress,
+          score: summary.correct_answers,
+          total_questions: summary.total_questions,
+          grade: calculateGrade(summary.correct_answers, summary.total_questions),
+          status: calculateStatus(summary.correct_answers, summary.total_questions),
+          lockState: summary.lock_state,
+        }))
       );
-      setQuizSets(updatedQuizSets);
     } catch (error) {
       console.error('Error fetching quiz sets:', error);
     }
@@ -262,10 +266,17 @@ const DynamicQuizTable = () => {
     });
   };
 
-  const handleOpenUrlsModal = (urls: string[]) => {
-    const processedUrls = processUrlsForDisplay(urls);
-    setSelectedUrls(processedUrls);
-    onOpen();
+  const handleOpenUrlsModal = async (quizSetId: string) => {
+    // URLs are only needed for the modal, so they are fetched when it opens
+    try {
+      const response = await fetch(`${backendUrl}/getQuizSetDetails/${quizSetId}`, { headers: takerHeaders() });
+      if (!response.ok) throw new Error('Network response was not ok');
+      const details = await response.json();
+      setSelectedUrls(processUrlsForDisplay(details.urls));
+      onOpen();
+    } catch (error) {
+      console.error('Error fetching quiz set URLs:', error);
+    }
   };
 
   const handleParentCheckboxChange = (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -495,7 +506,7 @@ const DynamicQuizTable = () => {
                 <IconButton
                   aria-label="View URLs"
                   icon={<OpenInNewWindowIcon style={{ width: '20px', height: '20px' }} />}
-                  onClick={() => handleOpenUrlsModal(quizSet.urls)}
+                  onClick={() => handleOpenUrlsModal(quizSet.id)}
                   bg="transparent"
                   _hover={{ color: 'blue.500' }}
                   size="sm"
@@ -587,7 +598,7 @@ const DynamicQuizTable = () => {
                     icon={
                       <OpenInNewWindowIcon style={{ width: '20px', height: '20px' }} />
                     }
-                    onClick={() => handleOpenUrlsModal(quizSet.urls)}
+                    onClick={() => handleOpenUrlsModal(quizSet.id)}
                     bg="transparent"
                     _hover={{ color: 'blue.500' }}
                     size="sm"
@@ -84,7 +84,24 @@ const ScrapingSection: React.FC<ScrapingSectionProps> = ({ onScrapeComplete, qui
       }
   
       const data = await response.json();
-      console.log('Scraping completed successfully:', data);
+      console.log('Scraping job started:', data);
+
+      // Scraping runs as a background job on the backend; poll until it finishes
+      let job = data;
+      while (job.status !== 'completed' && job.status !== 'failed') {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const jobResponse = await fetch(`${backendUrl}/scrapeJobs/${data.job_id}`);
+        if (!jobResponse.ok) {
+          throw new Error(`Error: ${jobResponse.statusText}`);
+        }
+        job = await jobResponse.json();
+        console.log(`Scrape job ${data.job_id}: ${job.status}, ${job.pages_done} pages, ${job.questions_inserted} questions`);
+      }
+
+      if (job.status === 'failed') {
+        throw new Error(`Scrape job failed: ${job.errors.join(', ')}`);
+      }
+      console.log('Scraping completed successfully:', job);
   
       onScrapeComplete(true, quizSetTitle);
       toast({
@@ -25,6 +25,7 @@ import { Question } from '../../utils/types';
 import LoadingLayout from '../../components/LoadingLayout';
 import { useRouter } from 'next/router';
 import { getBackendUrl } from '@/utils/getBackendUrl';
+import { takerHeaders } from '@/utils/takerId';
 import { useBreakpointValue } from '@chakra-ui/react';
 
 interface QuestionData {
@@ -109,7 +110,7 @@ const QuizModePage = () => {
   useEffect(() => {
     const fetchQuestions = async () => {
       try {
-        const response = await fetch(`${backendUrl}/getQuestionsByQuizSet/${id}`);
+        const response = await fetch(`${backendUrl}/getQuestionsByQuizSet/${id}`, { headers: takerHeaders() });
         if (!response.ok) throw new Error('Network response was not ok');
         let data = await response.json();
 
@@ -196,7 +197,7 @@ const QuizModePage = () => {
     console.log("Confirming shuffle questions...");
     try {
       console.log("Before fetching shuffled questions");
-      const shuffledResponse = await fetch(`${backendUrl}/shuffleQuestions/${id}`, { method: 'POST' });
+      const shuffledResponse = await fetch(`${backendUrl}/shuffleQuestions/${id}`, { method: 'POST', headers: takerHeaders() });
       if (!shuffledResponse.ok) throw new Error('Error shuffling questions');
   
       let shuffledQuestionsData = await shuffledResponse.json();
@@ -255,7 +256,7 @@ const QuizModePage = () => {
 
   const fetchUserSelections = async () => {
     try {
-      const response = await fetch(`${backendUrl}/getUserSelections/${id}`);
+      const response = await fetch(`${backendUrl}/getUserSelections/${id}`, { headers: takerHeaders() });
       if (!response.ok) throw new Error('Network response was not ok');
       const selections = await response.json();
       setQuestions(prevQuestions => prevQuestions.map(q => ({
@@ -270,7 +271,7 @@ const QuizModePage = () => {
   const fetchQuestionsAndUpdateSelections = async () => {
     console.log("Fetching questions...");
     try {
-      const response = await fetch(`${backendUrl}/getQuestionsByQuizSet/${id}`);
+      const response = await fetch(`${backendUrl}/getQuestionsByQuizSet/${id}`, { headers: takerHeaders() });
       if (!response.ok) throw new Error('Network response was not ok');
       let data = await response.json();
   
@@ -342,7 +343,7 @@ const QuizModePage = () => {
 
   const fetchFavorites = async () => {
     try {
-      const response = await fetch(`${backendUrl}/getFavorites/${id}`);
+      const response = await fetch(`${backendUrl}/getFavorites/${id}`, { headers: takerHeaders() });
       if (!response.ok) throw new Error('Network response was not ok');
       const favoritedQuestions = await response.json();
       setFavorites(new Set(favoritedQuestions.map((q: { id: number }) => q.id)));
@@ -377,7 +378,7 @@ const QuizModePage = () => {
   const handleToggleFavorites = (questionId: number) => {
     fetch(`${backendUrl}/toggleFavorite`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: takerHeaders({ 'Content-Type': 'application/json' }),
       body: JSON.stringify({ question_id: questionId })
     })
     .then(response => response.json())
@@ -444,7 +445,7 @@ const QuizModePage = () => {
   
     await fetch(`${backendUrl}/updateUserSelection`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: takerHeaders({ 'Content-Type': 'application/json' }),
       body: JSON.stringify({ question_id: questionId, selected_option: selectedOption })
     });
   
@@ -616,7 +617,8 @@ const updateScore = async (questionId: number, scoreChange: number) => {
     console.log("Initiating reset");
     try {
       const response = await fetch(`${backendUrl}/resetQuestions/${id}`, {
-        method: 'POST'
+        method: 'POST',
+        headers: takerHeaders()
       });
       if (!response.ok) throw new Error('Network response was not ok');
   
@@ -0,0 +1,27 @@
+// utils/takerId.ts
+
+const TAKER_ID_KEY = 'quizTakerId';
+
+const newTakerId = (): string => {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  // crypto.randomUUID is only available on secure origins
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+};
+
+// Each browser keeps its own taker id, so its answers, favorites and shuffles are never shared with other browsers
+export const getTakerId = (): string => {
+  let takerId = window.localStorage.getItem(TAKER_ID_KEY);
+  if (!takerId) {
+    takerId = newTakerId();
+    window.localStorage.setItem(TAKER_ID_KEY, takerId);
+  }
+  return takerId;
+};
+
+// Headers for requests that read or change the taker's own attempt
+export const takerHeaders = (headers: Record<string, string> = {}): Record<string, string> => ({
+  ...headers,
+  'X-User-Id': getTakerId(),
+});